@@ -1,4 +1,9 @@
 #!/bin/bash
-for f in *.eps; do
-  gs -dSAFER -dBATCH -dNOPAUSE -r1200 -sDEVICE=tiff24nc -sCompression=lzw -dEPSCrop -sOutputFile="${f%.eps}.tif" "$f"
-done
\ No newline at end of file
+for f in *.eps *.pdf; do
+  # If figure exists as both EPS and PDF (matplotlib figures are now saved as PDF), only render the newest
+  if [ "${f##*.}" = "eps" ]; then other="${f%.eps}.pdf"; crop="-dEPSCrop"; else other="${f%.pdf}.eps"; crop="-dUseCropBox"; fi
+  if [ -f "$other" ] && [ "$other" -nt "$f" ]; then
+    continue
+  fi
+  gs -dSAFER -dBATCH -dNOPAUSE -r1200 -sDEVICE=tiff24nc -sCompression=lzw $crop -sOutputFile="${f%.*}.tif" "$f"
+done
@@ -13,14 +13,25 @@ template<typename A = std::milli>
 class Timer
 {
 public:
-    //! Create a new Timer with the specified name
-    Timer(const std::string &title) : m_Start(std::chrono::high_resolution_clock::now()), m_Title(title)
+    //! Create a new Timer with the specified name and, optionally, a stream to log wall-clock start and end times to
+    Timer(const std::string &title, std::ostream *log = nullptr)
+    :   m_Start(std::chrono::high_resolution_clock::now()), m_WallClockStart(std::chrono::system_clock::now()),
+        m_Title(title), m_Log(log)
     {}
 
     //! Stop the timer and print current elapsed time to terminal
     ~Timer()
     {
-        std::cout << m_Title << get() << std::endl;
+        const double elapsed = get();
+        std::cout << m_Title << elapsed << std::endl;
+
+        // If log is provided, write CSV row containing title (without trailing colon),
+        // wall-clock start and end times in seconds since epoch and elapsed time
+        if(m_Log != nullptr) {
+            const std::string phase = (!m_Title.empty() && m_Title.back() == ':') ? m_Title.substr(0, m_Title.size() - 1) : m_Title;
+            *m_Log << phase << "," << getSecondsSinceEpoch(m_WallClockStart) << ","
+                << getSecondsSinceEpoch(std::chrono::system_clock::now()) << "," << elapsed << std::endl;
+        }
     }
 
     //------------------------------------------------------------------------
@@ -35,11 +46,21 @@ public:
     }
 
 private:
+    //------------------------------------------------------------------------
+    // Private static methods
+    //------------------------------------------------------------------------
+    static double getSecondsSinceEpoch(std::chrono::time_point<std::chrono::system_clock> time)
+    {
+        return std::chrono::duration<double>(time.time_since_epoch()).count();
+    }
+
     //------------------------------------------------------------------------
     // Members
     //------------------------------------------------------------------------
     std::chrono::time_point<std::chrono::high_resolution_clock> m_Start;
+    std::chrono::time_point<std::chrono::system_clock> m_WallClockStart;
     std::string m_Title;
+    std::ostream *m_Log;
 };
 
 //------------------------------------------------------------------------
@@ -80,14 +80,23 @@ int main()
         // Download weights
         pullEEStateFromDevice();
         
-        // **HACK** Download row lengths
+        // **HACK** Download row lengths and postsynaptic indices
         extern unsigned int *d_rowLengthEE;
+        extern unsigned int *d_indEE;
         CHECK_CUDA_ERRORS(cudaMemcpy(CEE.rowLength, d_rowLengthEE, Parameters::numExcitatory * sizeof(unsigned int), cudaMemcpyDeviceToHost));
+        CHECK_CUDA_ERRORS(cudaMemcpy(CEE.ind, d_indEE, Parameters::numExcitatory * CEE.maxRowLength * sizeof(unsigned int), cudaMemcpyDeviceToHost));
 
-        // Write row weights to file
+        // Write row lengths to file
+        std::ofstream rowLengths("row_lengths.bin", std::ios::binary);
+        rowLengths.write(reinterpret_cast<char*>(CEE.rowLength), sizeof(unsigned int) * Parameters::numExcitatory);
+
+        // Write row weights and postsynaptic indices to file
+        // **NOTE** padding at end of each row is skipped so these are compact ragged arrays
         std::ofstream weights("weights.bin", std::ios::binary);
+        std::ofstream indices("indices.bin", std::ios::binary);
         for(unsigned int i = 0; i < Parameters::numExcitatory; i++) {
             weights.write(reinterpret_cast<char*>(&gEE[i * CEE.maxRowLength]), sizeof(scalar) * CEE.rowLength[i]);
+            indices.write(reinterpret_cast<char*>(&CEE.ind[i * CEE.maxRowLength]), sizeof(unsigned int) * CEE.rowLength[i]);
         }
     }
 #endif // !STATIC
@@ -1,4 +1,5 @@
 // Standard C++ includes
+#include <fstream>
 #include <memory>
 #include <random>
 #include <vector>
@@ -74,13 +75,18 @@ void buildRowLengths(unsigned int numPre, unsigned int numPost, size_t numConnec
 
 int main()
 {
+    // Create log of wall-clock phase timings for aligning with power traces
+    std::ofstream timingLog("timing.csv");
+    timingLog.precision(16);
+    timingLog << "Phase, Start [s], End [s], Duration [ms]" << std::endl;
+
     {
-        Timer<> timer("Allocation:");
+        Timer<> timer("Allocation:", &timingLog);
         allocateMem();
     }
 
     {
-        Timer<> timer("Building row lengths:");
+        Timer<> timer("Building row lengths:", &timingLog);
 
         std::mt19937 rng;
         BUILD_PROJECTION(23, E, 23, E);
@@ -150,14 +156,14 @@ int main()
     }
 
     {
-        Timer<> timer("Initialization:");
+        Timer<> timer("Initialization:", &timingLog);
         initialize();
     }
 
 
     // Final setup
     {
-        Timer<> timer("Sparse init:");
+        Timer<> timer("Sparse init:", &timingLog);
         initpotjans_microcircuit();
     }
 
@@ -179,7 +185,7 @@ int main()
     double recordMs = 0.0;
 
     {
-        Timer<> timer("Simulation:");
+        Timer<> timer("Simulation:", &timingLog);
         // Loop through timesteps
         const unsigned int timesteps = round(Parameters::durationMs / DT);
         const unsigned int tenPercentTimestep = timesteps / 10;
@@ -219,7 +225,7 @@ int main()
 
     // Write spike recorder cache to disk
     {
-        Timer<> timer("Writing spikes to disk:");
+        Timer<> timer("Writing spikes to disk:", &timingLog);
         for(auto &s : spikeRecorders) {
             s->writeCache();
         }
@@ -233,7 +239,16 @@ int main()
     std::cout << "\tDevice sparse init:" << sparseInitDevice_tme * 1000.0 << std::endl;
     std::cout << "\tNeuron simulation:" << neuron_tme * 1000.0 << std::endl;
     std::cout << "\tSynapse simulation:" << synapse_tme * 1000.0 << std::endl;
+
+    // Add kernel timings to log - these are accumulated over the simulation so have no wall-clock times
+    timingLog << "Host init,,," << initHost_tme * 1000.0 << std::endl;
+    timingLog << "Device init,,," << initDevice_tme * 1000.0 << std::endl;
+    timingLog << "Host sparse init,,," << sparseInitHost_tme * 1000.0 << std::endl;
+    timingLog << "Device sparse init,,," << sparseInitDevice_tme * 1000.0 << std::endl;
+    timingLog << "Neuron simulation,,," << neuron_tme * 1000.0 << std::endl;
+    timingLog << "Synapse simulation,,," << synapse_tme * 1000.0 << std::endl;
 #endif
+    timingLog << "Record,,," << recordMs << std::endl;
     std::cout << "Record:" << recordMs << "ms" << std::endl;
 
     return 0;
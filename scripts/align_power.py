@@ -0,0 +1,152 @@
+import numpy as np
+import sys
+
+from os import path
+from pandas import DataFrame, concat, read_csv
+
+# Phase of timing log containing neuron and synapse simulation kernels
+simulation_phase = "Simulation"
+
+# Kernels, accumulated by GeNN over simulation phase, whose energy is estimated from simulation phase
+simulation_kernels = ["Neuron simulation", "Synapse simulation", "Record"]
+
+# Number of candidate clock offsets evaluated in coarse search over all possible offsets
+num_coarse_offsets = 4096
+
+def load_power_trace(filename, threshold):
+    trace = np.loadtxt(filename, skiprows=1, delimiter=",",
+                       dtype={"names": ("time", "power", ), "formats": (float, float)})
+
+    # Filter out clearly erroneous values (as in plot_microcircuit_power.py)
+    valid = (trace["power"] < (threshold * 5.0))
+    return trace["time"][valid], trace["power"][valid]
+
+def load_timing_log(filename):
+    # Load timing log written by simulator - kernel timings have no start and end times
+    timing = read_csv(filename, skiprows=1, header=None, names=["phase", "start", "end", "duration"],
+                      dtype={"phase": str, "start": float, "end": float, "duration": float})
+    timed = timing["start"].notnull().values
+    return timing[timed], timing[~timed]
+
+def _offset_squared_error(time, cum_power, cum_power_sq, boundaries, candidate_offsets):
+    # Calculate indices into trace of every phase boundary for every candidate offset
+    boundary_indices = np.searchsorted(time, boundaries[np.newaxis, :] + candidate_offsets[:, np.newaxis])
+
+    # Add start and end of trace so idle periods form segments too
+    num_candidates = len(candidate_offsets)
+    boundary_indices = np.hstack((np.zeros((num_candidates, 1), dtype=int), boundary_indices,
+                                  np.full((num_candidates, 1), len(time), dtype=int)))
+
+    # Calculate count, sum and sum of squares of power in each segment
+    count = np.diff(boundary_indices, axis=1)
+    sum_power = np.diff(cum_power[boundary_indices], axis=1)
+    sum_power_sq = np.diff(cum_power_sq[boundary_indices], axis=1)
+
+    # Squared error of a piecewise-constant model of power within segments
+    return np.sum(sum_power_sq - ((sum_power * sum_power) / np.maximum(count, 1)), axis=1)
+
+def estimate_offset(time, power, phase_start, phase_end, step_s=0.01):
+    # Cumulative sums of power and power squared, starting from zero
+    cum_power = np.hstack(([0.0], np.cumsum(power)))
+    cum_power_sq = np.hstack(([0.0], np.cumsum(power * power)))
+    boundaries = np.unique(np.hstack((phase_start, phase_end)))
+
+    # Range of offsets which place entire run within trace
+    min_offset = time[0] - np.amin(phase_start)
+    max_offset = time[-1] - np.amax(phase_end)
+    if max_offset < min_offset:
+        raise ValueError("Power trace (%fs) is shorter than run (%fs)"
+                         % (time[-1] - time[0], np.amax(phase_end) - np.amin(phase_start)))
+
+    # Coarse search over all offsets
+    # **NOTE** no initial guess is made from where power crosses a threshold as noise makes this unreliable
+    coarse_step_s = max(step_s, (max_offset - min_offset) / num_coarse_offsets)
+    coarse_offsets = np.arange(min_offset, max_offset + coarse_step_s, coarse_step_s)
+    coarse_best = np.argmin(_offset_squared_error(time, cum_power, cum_power_sq, boundaries, coarse_offsets))
+    if coarse_best == 0 or coarse_best == (len(coarse_offsets) - 1):
+        print("WARNING: clock offset %fs places run at %s of power trace - is trace complete?"
+              % (coarse_offsets[coarse_best], "start" if coarse_best == 0 else "end"))
+
+    # Fine search around best coarse offset
+    fine_offsets = coarse_offsets[coarse_best] + np.arange(-coarse_step_s, coarse_step_s + step_s, step_s)
+    return fine_offsets[np.argmin(_offset_squared_error(time, cum_power, cum_power_sq, boundaries, fine_offsets))]
+
+def estimate_idle_power(time, power, phase_start, phase_end, offset):
+    # Average power before and after (aligned) run
+    idle = (time < (np.amin(phase_start) + offset)) | (time > (np.amax(phase_end) + offset))
+    return np.average(power[idle])
+
+def calc_phase_energy(time, power, phase_start, phase_end, offset):
+    # Cumulative energy over trace using trapezoid rule
+    cum_energy = np.hstack(([0.0], np.cumsum(0.5 * (power[1:] + power[:-1]) * np.diff(time))))
+
+    # Energy of each phase is difference in cumulative energy between its (aligned) start and end
+    return (np.interp(phase_end + offset, time, cum_energy)
+            - np.interp(phase_start + offset, time, cum_energy))
+
+def align_run(run, device, timing_filename, power_filename, threshold, idle_power=None):
+    time, power = load_power_trace(power_filename, threshold)
+    phases, kernels = load_timing_log(timing_filename)
+    phase_start = phases["start"].values
+    phase_end = phases["end"].values
+
+    # Align clocks and, if it isn't specified, estimate idle power from trace outside of run
+    offset = estimate_offset(time, power, phase_start, phase_end)
+    if idle_power is None or np.isnan(idle_power):
+        idle_power = estimate_idle_power(time, power, phase_start, phase_end, offset)
+
+    # Calculate energy and idle energy of each phase
+    energy = calc_phase_energy(time, power, phase_start, phase_end, offset)
+    duration_s = phase_end - phase_start
+    idle_energy = idle_power * duration_s
+
+    result = DataFrame({"run": run, "device": device, "phase": phases["phase"].values,
+                        "duration_s": duration_s, "energy_j": energy,
+                        "dynamic_energy_j": energy - idle_energy, "mean_power_w": energy / duration_s,
+                        "idle_power_w": idle_power, "clock_offset_s": offset})
+
+    # Apportion simulation phase energy between kernels based on their share of its duration
+    # **NOTE** this assumes power is constant throughout the simulation phase
+    simulation = result[result["phase"] == simulation_phase]
+    kernels = kernels[kernels["phase"].isin(simulation_kernels)]
+    if len(simulation) == 1 and len(kernels) > 0:
+        fraction = (kernels["duration"].values / 1000.0) / simulation["duration_s"].values[0]
+        result = concat([result, DataFrame({"run": run, "device": device, "phase": kernels["phase"].values,
+                                            "duration_s": kernels["duration"].values / 1000.0,
+                                            "energy_j": fraction * simulation["energy_j"].values[0],
+                                            "dynamic_energy_j": fraction * simulation["dynamic_energy_j"].values[0],
+                                            "mean_power_w": simulation["mean_power_w"].values[0],
+                                            "idle_power_w": idle_power, "clock_offset_s": offset})])
+    return result
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: align_power.py MANIFEST [OUTPUT]")
+        print("\tMANIFEST is a CSV file with columns: run, device, timing log, power trace, threshold, idle power")
+        print("\tthreshold is an upper bound on idle power - samples above 5x threshold are discarded as erroneous")
+        print("\tidle power may be left empty to estimate it from the trace before and after the run")
+        sys.exit(1)
+
+    # Load manifest - paths are relative to it
+    manifest = read_csv(sys.argv[1], skiprows=1, header=None,
+                        names=["run", "device", "timing", "power", "threshold", "idle_power"],
+                        skipinitialspace=True)
+    manifest_dir = path.dirname(sys.argv[1])
+
+    # Align each run
+    # **NOTE** traces have different lengths and sample rates so runs are aligned one at a time,
+    # with the search over all candidate offsets and phase boundaries of each run vectorised
+    results = concat([align_run(r["run"], r["device"], path.join(manifest_dir, r["timing"]),
+                                path.join(manifest_dir, r["power"]), r["threshold"], r["idle_power"])
+                      for _, r in manifest.iterrows()], ignore_index=True)
+
+    # Show energy of each phase for each run side by side so regressions are visible
+    print(results.pivot_table(index=["device", "run"], columns="phase", values="energy_j").to_string())
+
+    # Write results as CSV or, if requested, as columnar dataset partitioned by device
+    if len(sys.argv) > 2:
+        if sys.argv[2].endswith(".parquet"):
+            from columnar import export_table
+            export_table(results, sys.argv[2], ["device"])
+        else:
+            results.to_csv(sys.argv[2], index=False)
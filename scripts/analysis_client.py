@@ -0,0 +1,35 @@
+# Thin client for analysis_server.py e.g.
+# "python analysis_client.py render microcircuit_accuracy" or "python analysis_client.py kl 23E"
+# **NOTE** deliberately only imports the standard library to keep start-up fast
+import sys
+
+from multiprocessing.connection import Client
+
+from analysis_server import address, get_authkey
+
+if len(sys.argv) < 2:
+    print("Usage: analysis_client.py ping|preload|clear|shutdown|render FIGURE...|kl POPULATION...")
+    sys.exit(1)
+
+connection = Client(address, authkey=get_authkey())
+connection.send(sys.argv[1:])
+status, output, result = connection.recv()
+connection.close()
+
+# Echo anything server printed
+if output:
+    sys.stdout.write(output)
+
+if status == "ok":
+    # Print each result on its own line
+    if isinstance(result, dict):
+        for key in sorted(result):
+            print("%s: %s" % (key, result[key]))
+    elif isinstance(result, list):
+        for r in result:
+            print(r)
+    else:
+        print(result)
+else:
+    sys.stderr.write(result)
+    sys.exit(1)
@@ -0,0 +1,175 @@
+# Long-running analysis server which keeps the scientific stack, spike data and computed
+# statistics in memory so repeated figure and statistic requests don't pay start-up costs.
+# Start with "python analysis_server.py [--preload] [presentation]" and then send requests
+# with analysis_client.py e.g. "python analysis_client.py render microcircuit_accuracy"
+# **NOTE** only the standard library is imported here - everything else is imported lazily
+import glob
+import os
+import runpy
+import sys
+import time
+import traceback
+
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# Directory, only accessible by current user, containing socket and authentication key
+# **NOTE** connections are unpickled so must only be accepted from the user running the server
+runtime_dir = os.path.join(os.path.expanduser("~"), ".genn_analysis_server")
+
+# Use a UNIX domain socket where available, otherwise fall back to TCP on localhost
+if hasattr(os, "fchmod"):
+    address = os.path.join(runtime_dir, "server.sock")
+else:
+    address = ("localhost", 6789)
+
+def get_runtime_dir():
+    if not os.path.exists(runtime_dir):
+        os.makedirs(runtime_dir, 0o700)
+    os.chmod(runtime_dir, 0o700)
+    return runtime_dir
+
+def get_authkey():
+    # Read random per-user key, creating it (readable only by user) if it doesn't exist
+    key_path = os.path.join(get_runtime_dir(), "authkey")
+    if not os.path.exists(key_path):
+        key_file = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            os.write(key_file, os.urandom(32))
+        finally:
+            os.close(key_file)
+    with open(key_path, "rb") as key_file:
+        return key_file.read()
+
+# Directory containing this script - figure scripts use paths relative to it
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Statistics which have already been computed, indexed by request
+stat_cache = {}
+
+def get_microcircuit():
+    # Import microcircuit analysis module (and hence pandas, scipy, elephant etc) on first use
+    import microcircuit
+    return microcircuit
+
+def preload_spikes():
+    microcircuit = get_microcircuit()
+    for name in microcircuit.population_names:
+        microcircuit.load_spikes(name + ".csv")
+
+def get_figures():
+    # Names of figures which can be rendered i.e. with a plot_<figure>.py script (plot_settings.py is shared style)
+    return sorted(os.path.basename(p)[5:-3] for p in glob.glob(os.path.join(script_dir, "plot_*.py"))
+                  if os.path.basename(p) != "plot_settings.py")
+
+def render(figure):
+    # On first render, select non-interactive backend so plt.show doesn't block
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    # Only allow existing figure scripts to be run
+    if figure not in get_figures():
+        raise ValueError("Unknown figure '%s' - available figures are %s" % (figure, ", ".join(get_figures())))
+    script = os.path.join(script_dir, "plot_%s.py" % figure)
+
+    # Run figure script as if it had been run from the command line
+    start_time = time.time()
+    runpy.run_path(script, run_name="__main__")
+    plt.close("all")
+    return "Rendered %s in %fs" % (figure, time.time() - start_time)
+
+def calc_kl(name):
+    # If KL divergence for this population has already been computed, return it
+    if ("kl", name) in stat_cache:
+        return stat_cache[("kl", name)]
+
+    microcircuit = get_microcircuit()
+    spike_times, spike_ids, _, num, nest_spike_times, nest_spike_ids = microcircuit.load_spikes(name + ".csv")
+    pop_kl = microcircuit.calc_population_kl(spike_times, spike_ids, num, nest_spike_times, nest_spike_ids)
+
+    # Cache just the KL divergences
+    kl = dict((stat, float(values[3])) for stat, values in pop_kl.items())
+    stat_cache[("kl", name)] = kl
+    return kl
+
+def handle_request(request):
+    command = request[0]
+    if command == "ping":
+        return "pong"
+    elif command == "render":
+        return [render(f) for f in request[1:]]
+    elif command == "kl":
+        return dict((name, calc_kl(name)) for name in request[1:])
+    elif command == "preload":
+        preload_spikes()
+        return "Preloaded spikes"
+    elif command == "clear":
+        stat_cache.clear()
+        get_microcircuit()._spike_cache.clear()
+        return "Cleared cache"
+    else:
+        raise ValueError("Unknown command '%s'" % command)
+
+if __name__ == "__main__":
+    # Run from script directory so relative data and figure paths resolve
+    os.chdir(script_dir)
+    sys.path.insert(0, script_dir)
+
+    if "--preload" in sys.argv[1:]:
+        print("Preloading spikes...")
+        preload_spikes()
+
+    # Remove socket left behind by a previous server
+    authkey = get_authkey()
+    if isinstance(address, str) and os.path.exists(address):
+        os.remove(address)
+
+    listener = Listener(address, authkey=authkey)
+    print("Listening on %s" % (address, ))
+
+    running = True
+    while running:
+        # Ignore clients which fail authentication
+        try:
+            connection = listener.accept()
+        except (AuthenticationError, EOFError, IOError):
+            continue
+
+        try:
+            request = connection.recv()
+            if not isinstance(request, list) or len(request) == 0 or not all(isinstance(r, str) for r in request):
+                connection.send(("error", "", "Requests should be non-empty lists of strings\n"))
+                continue
+            print("Request: %s" % " ".join(request))
+
+            # Capture anything printed while servicing request so it can be returned to client
+            output = StringIO()
+            stdout = sys.stdout
+            sys.stdout = output
+            try:
+                if request[0] == "shutdown":
+                    running = False
+                    result = "Shutting down"
+                else:
+                    result = handle_request(request)
+                status = "ok"
+            except Exception:
+                result = traceback.format_exc()
+                status = "error"
+            finally:
+                sys.stdout = stdout
+
+            connection.send((status, output.getvalue(), result))
+        except (EOFError, IOError):
+            pass
+        finally:
+            connection.close()
+
+    listener.close()
@@ -0,0 +1,170 @@
+import numpy as np
+
+# Bins are packed little-endian into 64-bit words
+word_bits = 64
+
+def _popcount(words):
+    # Use native popcount where numpy provides one
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    # Otherwise, count bits of each byte with lookup table and sum into words
+    else:
+        byte_counts = _byte_popcount[words.view(np.uint8)]
+        return byte_counts.reshape(words.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+_byte_popcount = np.asarray([bin(b).count("1") for b in range(256)], dtype=np.uint8)
+
+class BitRaster(object):
+    """Binary neuron x time-bin spike raster with each bin stored as a single bit.
+    Bins containing more than one spike are treated as containing one, which at
+    2ms bins (i.e. the refractory period) loses nothing."""
+    def __init__(self, words, num_bins):
+        self.words = words
+        self.num_bins = num_bins
+
+    @classmethod
+    def from_spikes(cls, spike_times, spike_ids, num, t_start, t_stop, bin_ms=2.0):
+        # Discard spikes outside of range
+        mask = (spike_times >= t_start) & (spike_times < t_stop)
+        spike_ids = spike_ids[mask]
+        spike_bins = ((spike_times[mask] - t_start) / bin_ms).astype(np.int64)
+
+        # Set bit corresponding to each spike directly in packed words
+        num_bins = int(np.ceil((t_stop - t_start) / bin_ms))
+        words = np.zeros((num, (num_bins + word_bits - 1) // word_bits), dtype="<u8")
+        np.bitwise_or.at(words, (spike_ids, spike_bins // word_bits),
+                         np.left_shift(np.uint64(1), (spike_bins % word_bits).astype(np.uint64)))
+        return cls(words, num_bins)
+
+    @property
+    def num_neurons(self):
+        return self.words.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.words.nbytes
+
+    def subset(self, neurons):
+        return BitRaster(self.words[neurons], self.num_bins)
+
+    def spike_counts(self):
+        """Number of occupied bins for each neuron"""
+        return _popcount(self.words).sum(axis=1, dtype=np.int64)
+
+    def population_counts(self, block_size=1024):
+        """Number of neurons spiking in each bin"""
+        counts = np.zeros(self.words.shape[1] * word_bits, dtype=np.int64)
+        for b in range(0, self.num_neurons, block_size):
+            # Unpack block of rows to bits and sum
+            bits = np.unpackbits(self.words[b:b + block_size].view(np.uint8), axis=1, bitorder="little")
+            counts += bits.sum(axis=0, dtype=np.int64)
+        return counts[:self.num_bins]
+
+    def co_occurrence(self, other=None, block_size=64, other_block_size=1024):
+        """Number of bins in which each pair of neurons (from this raster and other,
+        or all pairs within this raster) both spike, calculated with AND + popcount
+        over block_size x other_block_size tiles so temporaries remain small"""
+        other_words = self.words if other is None else other.words
+        result = np.empty((self.num_neurons, other_words.shape[0]), dtype=np.int64)
+        for b in range(0, self.num_neurons, block_size):
+            block = self.words[b:b + block_size, np.newaxis, :]
+            for c in range(0, other_words.shape[0], other_block_size):
+                other_block = other_words[np.newaxis, c:c + other_block_size, :]
+                result[b:b + block_size, c:c + other_block_size] = _popcount(block & other_block).sum(axis=2, dtype=np.int64)
+        return result
+
+    def iter_correlation_blocks(self, other=None, block_size=64, other_block_size=1024, lower=False):
+        """Yield (row, column, correlation) for each tile of the pairwise correlation
+        matrix so it can be reduced without ever being held in memory. If lower is
+        set, only tiles which intersect the lower triangle of the matrix are yielded"""
+        other = self if other is None else other
+        n = float(self.num_bins)
+        counts = self.spike_counts().astype(float)
+        other_counts = other.spike_counts().astype(float)
+        variance = counts * (n - counts)
+        other_variance = other_counts * (n - other_counts)
+
+        for b in range(0, self.num_neurons, block_size):
+            rows = slice(b, min(b + block_size, self.num_neurons))
+            block = BitRaster(self.words[rows], self.num_bins)
+            num_other = min(other.num_neurons, rows.stop) if lower else other.num_neurons
+            for c in range(0, num_other, other_block_size):
+                cols = slice(c, min(c + other_block_size, num_other))
+                co_occurrence = block.co_occurrence(BitRaster(other.words[cols], other.num_bins),
+                                                    block_size, other_block_size)
+
+                # Covariance and variance of binary variables from counts
+                covariance = (n * co_occurrence) - np.outer(counts[rows], other_counts[cols])
+
+                # Neurons which never (or always) spike have undefined correlation
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    yield b, c, covariance / np.sqrt(np.outer(variance[rows], other_variance[cols]))
+
+    def correlation(self, other=None, block_size=64, other_block_size=1024, dtype=np.float64):
+        """Pairwise Pearson correlation coefficient between binary binned spike trains.
+        Only the result is allocated at full size so float32 halves peak memory"""
+        other = self if other is None else other
+        result = np.empty((self.num_neurons, other.num_neurons), dtype=dtype)
+        for b, c, block in self.iter_correlation_blocks(other, block_size, other_block_size):
+            result[b:b + block.shape[0], c:c + block.shape[1]] = block
+        return result
+
+    def lower_correlation_histogram(self, bins, block_size=64, other_block_size=1024):
+        """Histogram and mean of the correlation coefficients between all distinct
+        pairs of neurons (the lower triangle of the correlation matrix), excluding
+        undefined correlations, accumulated tile by tile in constant memory"""
+        bins = np.asarray(bins)
+        hist = np.zeros(len(bins) - 1, dtype=np.int64)
+        total = 0.0
+        num_valid = 0
+        for b, c, block in self.iter_correlation_blocks(None, block_size, other_block_size, lower=True):
+            # Select pairs below diagonal with defined correlation
+            row = b + np.arange(block.shape[0])[:, np.newaxis]
+            col = c + np.arange(block.shape[1])[np.newaxis, :]
+            values = block[(col < row) & np.isfinite(block)]
+
+            hist += np.histogram(values, bins)[0]
+            total += np.sum(values)
+            num_valid += len(values)
+        return hist, (total / num_valid) if num_valid > 0 else np.nan
+
+    def synchrony(self):
+        """Golomb's chi^2 synchrony measure: variance of population-averaged activity
+        relative to the mean variance of individual neurons' activity"""
+        n = float(self.num_bins)
+        p = self.spike_counts() / n
+        neuron_variance = np.sum(p * (1.0 - p))
+        return np.var(self.population_counts()) / (self.num_neurons * neuron_variance)
+
+    def fano_factor(self, window_bins=1):
+        """Fano factor of population spike count in windows of window_bins bins"""
+        population_counts = self.population_counts()
+        num_windows = len(population_counts) // window_bins
+        window_counts = population_counts[:num_windows * window_bins].reshape((num_windows, window_bins)).sum(axis=1)
+        return np.var(window_counts) / np.mean(window_counts)
+
+if __name__ == "__main__":
+    from os import path
+    from microcircuit import N_full, N_scaling, population_names, read_genn_spikes
+
+    for name in population_names:
+        spike_path = path.join("potjans_spikes", name + ".csv")
+        if not path.exists(spike_path):
+            print("Spikes for population %s missing" % name)
+            continue
+
+        spike_times, spike_ids = read_genn_spikes(spike_path)
+        num = int(N_full[name[:-1]][name[-1]] * N_scaling)
+
+        # Bin spikes using bins corresponding to 2ms refractory period
+        raster = BitRaster.from_spikes(spike_times, spike_ids, num, 1000.0, 10000.0)
+        print("%s: %u x %u bins in %fMiB (dense int64 would be %fMiB)"
+              % (name, raster.num_neurons, raster.num_bins, raster.nbytes / (1024.0 * 1024.0),
+                 raster.num_neurons * raster.num_bins * 8 / (1024.0 * 1024.0)))
+
+        # Calculate correlations between all pairs of 1000 randomly selected neurons
+        sample = raster.subset(np.random.choice(num, min(num, 1000), replace=False))
+        _, mean_correlation = sample.lower_correlation_histogram(np.linspace(-1.0, 1.0, 201))
+        print("\tMean correlation = %f" % mean_correlation)
+        print("\tSynchrony = %f" % raster.synchrony())
+        print("\tFano factor = %f" % raster.fano_factor())
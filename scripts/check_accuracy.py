@@ -0,0 +1,186 @@
+import argparse
+import numpy as np
+import sys
+
+from os import path
+from scipy.stats import iqr
+
+from bit_raster import BitRaster
+from microcircuit import N_full, N_scaling, calc_kl, duration, population_names, read_genn_spikes
+from nest_spikes import find_shards, load_nest_population
+
+# Kernel density smoothing used for each statistic (as in microcircuit.py)
+smoothing = {"rate": 0.3, "isi": 0.04, "corr": 0.002}
+
+def load_post_transient(times, ids):
+    post_transient = (times > 1000.0)
+    return times[post_transient], ids[post_transient]
+
+def calc_neuron_stats(spike_times, spike_ids, num):
+    # Calculate firing rate of every neuron
+    rate = np.bincount(spike_ids, minlength=num) / duration
+
+    # Sort spikes by neuron then time and calculate ISIs between consecutive spikes from same neuron
+    order = np.lexsort((spike_times, spike_ids))
+    sorted_times = spike_times[order]
+    sorted_ids = spike_ids[order]
+    same_neuron = (sorted_ids[1:] == sorted_ids[:-1])
+    isi = np.diff(sorted_times)[same_neuron]
+    isi_id = sorted_ids[1:][same_neuron]
+
+    # Calculate CV ISI of every neuron from sums of ISIs and squared ISIs
+    num_isi = np.bincount(isi_id, minlength=num)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_isi = np.bincount(isi_id, weights=isi, minlength=num) / num_isi
+        var_isi = (np.bincount(isi_id, weights=isi * isi, minlength=num) / num_isi) - (mean_isi * mean_isi)
+        cv_isi = np.sqrt(np.maximum(var_isi, 0.0)) / mean_isi
+
+    # Bin spikes using bins corresponding to 2ms refractory period
+    raster = BitRaster.from_spikes(spike_times, spike_ids, num, 1000.0, 10000.0)
+    return rate, cv_isi, num_isi > 0, raster
+
+def sample_stats(neuron_stats, sample, max_corr_neurons):
+    rate, cv_isi, has_isi, raster = neuron_stats
+
+    # Correlations between all pairs of sampled neurons which spiked
+    active = sample[rate[sample] > 0.0][:max_corr_neurons]
+    correlation = raster.subset(active).correlation()
+
+    return {"rate": rate[sample],
+            "isi": cv_isi[sample[has_isi[sample]]],
+            "corr": correlation[np.tril_indices_from(correlation, k=-1)]}
+
+def calc_bins(data):
+    # Calculate bin-size using Freedman-Diaconis rule (as in microcircuit.calc_histogram)
+    bin_size = (2.0 * iqr(data)) / (float(len(data)) ** (1.0 / 3.0))
+    min_y = np.amin(data)
+    num_bins = np.ceil((np.amax(data) - min_y) / bin_size)
+    return np.arange(min_y, min_y + (num_bins * bin_size), bin_size)
+
+def calc_binned_kde(data, smoothing, bin_x):
+    # Approximate gaussian_kde(data, smoothing) evaluated at bin_x by histogramming
+    # data onto a grid and convolving with a gaussian kernel of the same bandwidth
+    # **NOTE** this is O(N + bins) rather than O(N * bins) like gaussian_kde.evaluate
+    bin_size = bin_x[1] - bin_x[0]
+    kernel_sd = smoothing * np.std(data, ddof=1)
+
+    # If kernel is narrow compared to bins, histogram onto finer grid so it is still resolved
+    oversample = int(min(64, max(1, np.ceil(2.0 * bin_size / max(kernel_sd, 1.0E-12)))))
+    grid_size = bin_size / oversample
+    grid_x = bin_x[0] + (np.arange(((len(bin_x) - 1) * oversample) + 1) * grid_size)
+    counts, _ = np.histogram(data, bins=np.append(grid_x, grid_x[-1] + grid_size) - (0.5 * grid_size))
+
+    # Build kernel with standard deviation in grid steps
+    sigma = max(kernel_sd / grid_size, 1.0E-3)
+    half_width = int(np.ceil(4.0 * sigma))
+    kernel = np.exp(-0.5 * (np.arange(-half_width, half_width + 1) / sigma) ** 2)
+
+    # Smooth (padding with zeros), sample at bin_x and normalise as in microcircuit.calc_histogram
+    hist_smooth = np.convolve(np.pad(counts.astype(float), half_width, "constant"), kernel, "valid")[::oversample]
+    return hist_smooth / np.sum(hist_smooth) / bin_size
+
+def bootstrap_kl(nest_data, data, stat, num_bootstrap, rng):
+    # Use NEST data to determine bins and calculate point estimate
+    bin_x = calc_bins(nest_data)
+    kl = calc_kl(calc_binned_kde(nest_data, smoothing[stat], bin_x), calc_binned_kde(data, smoothing[stat], bin_x))
+
+    # Resample both datasets with replacement to estimate spread of KL divergence
+    bootstrap = np.empty(num_bootstrap)
+    for b in range(num_bootstrap):
+        nest_resample = nest_data[rng.randint(len(nest_data), size=len(nest_data))]
+        resample = data[rng.randint(len(data), size=len(data))]
+        bootstrap[b] = calc_kl(calc_binned_kde(nest_resample, smoothing[stat], bin_x),
+                               calc_binned_kde(resample, smoothing[stat], bin_x))
+
+    return kl, bootstrap
+
+def decide(kl, bootstrap, threshold, alpha, final):
+    # Calculate percentile bootstrap confidence interval, widened to include the point estimate
+    # **NOTE** resampling inflates KL divergence so the percentiles can lie entirely above the point
+    # estimate - reflecting them about it (a basic interval) would then give an upper bound below it
+    lower_percentile, upper_percentile = np.percentile(bootstrap, [100.0 * alpha, 100.0 * (1.0 - alpha)])
+    lower = min(kl, lower_percentile)
+    upper = max(kl, upper_percentile)
+
+    # Decide if confidence interval lies entirely on one side of threshold or sample is complete
+    # **NOTE** as interval contains kl, a statistic can never pass with kl above threshold or fail with it below
+    if upper < threshold or (final and kl <= threshold):
+        return True
+    elif lower > threshold or final:
+        return False
+    else:
+        return None
+
+def check_population(name, genn_stats, nest_stats, num, thresholds, args, rng):
+    # Progressively grow nested random sample of neurons
+    permutation = rng.permutation(num)
+    sample_size = min(num, args.initial_neurons)
+    undecided = set(thresholds.keys())
+    results = {}
+    while True:
+        sample = permutation[:sample_size]
+        genn_sample = sample_stats(genn_stats, sample, args.max_corr_neurons)
+        nest_sample = sample_stats(nest_stats, sample, args.max_corr_neurons)
+
+        final = (sample_size == num)
+        for stat in sorted(undecided):
+            kl, bootstrap = bootstrap_kl(nest_sample[stat], genn_sample[stat], stat, args.bootstrap, rng)
+            stat_passed = decide(kl, bootstrap, thresholds[stat], args.alpha, final)
+            if stat_passed is not None:
+                results[stat] = (stat_passed, kl, sample_size)
+                undecided.remove(stat)
+
+        # Stop if all statistics are decided or any has (confidently) failed
+        if len(undecided) == 0 or any(not r[0] for r in results.values()):
+            break
+
+        sample_size = min(num, sample_size * 2)
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check accuracy of GeNN microcircuit spikes against NEST reference")
+    parser.add_argument("--genn-dir", default="potjans_spikes")
+    parser.add_argument("--nest-dir", default=path.join("potjans_spikes", "nest"))
+    parser.add_argument("--populations", nargs="+", default=population_names)
+    parser.add_argument("--rate-kl", type=float, default=0.02)
+    parser.add_argument("--isi-kl", type=float, default=0.15)
+    parser.add_argument("--corr-kl", type=float, default=0.2)
+    parser.add_argument("--initial-neurons", type=int, default=250)
+    parser.add_argument("--max-corr-neurons", type=int, default=1000)
+    parser.add_argument("--bootstrap", type=int, default=200,
+                        help="Number of bootstrap resamples (at least ~20 / alpha so the percentiles are not just the extremes)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="Each decision is made with (1 - alpha) one-sided confidence")
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+
+    thresholds = {"rate": args.rate_kl, "isi": args.isi_kl, "corr": args.corr_kl}
+    rng = np.random.RandomState(args.seed)
+
+    passed = True
+    for name in args.populations:
+        genn_path = path.join(args.genn_dir, name + ".csv")
+        if not path.exists(genn_path):
+            print("%s: GeNN spikes missing" % name)
+            sys.exit(2)
+
+        # Exit with same status if any shard of NEST reference is missing so missing data is not reported as a failure
+        nest_paths = find_shards(args.nest_dir, name)
+        if not all(path.exists(p) for p in nest_paths):
+            print("%s: NEST spikes missing" % name)
+            sys.exit(2)
+
+        num = int(N_full[name[:-1]][name[-1]] * N_scaling)
+        genn_stats = calc_neuron_stats(*(load_post_transient(*read_genn_spikes(genn_path)) + (num,)))
+        nest_stats = calc_neuron_stats(*(load_post_transient(*load_nest_population(args.nest_dir, name)) + (num,)))
+
+        results = check_population(name, genn_stats, nest_stats, num, thresholds, args, rng)
+        for stat in sorted(results):
+            stat_passed, kl, sample_size = results[stat]
+            print("%s %s: KL=%f (threshold %f, %u neurons) %s"
+                  % (name, stat, kl, thresholds[stat], sample_size, "PASS" if stat_passed else "FAIL"))
+            passed = passed and stat_passed
+
+    print("PASS" if passed else "FAIL")
+    sys.exit(0 if passed else 1)
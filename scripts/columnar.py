@@ -0,0 +1,98 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from glob import glob
+from os import makedirs, path
+
+# Number of rows in each Parquet row group - row groups are the unit min/max statistics are kept for
+row_group_size = 64 * 1024
+
+def _write_partition(table, dataset_dir, partition, sort_column):
+    # Sort so row group min/max statistics on sort column are tight and disjoint
+    table = table.take(pc.sort_indices(table, sort_keys=[(sort_column, "ascending")]))
+
+    # Write to hive-style partition directory e.g. simulator=genn/population=23E
+    partition_dir = path.join(dataset_dir, *["%s=%s" % (k, v) for k, v in partition])
+    if not path.exists(partition_dir):
+        makedirs(partition_dir)
+    pq.write_table(table, path.join(partition_dir, "part-0.parquet"),
+                   row_group_size=row_group_size, write_statistics=True)
+
+def export_spikes(spike_times, spike_ids, dataset_dir, simulator, population):
+    table = pa.table({"time": pa.array(spike_times, type=pa.float64()),
+                      "id": pa.array(spike_ids, type=pa.uint32())})
+    _write_partition(table, dataset_dir, [("simulator", simulator), ("population", population)], "time")
+
+def export_power(time, power, dataset_dir, device):
+    table = pa.table({"time": pa.array(time, type=pa.float64()),
+                      "power": pa.array(power, type=pa.float64())})
+    _write_partition(table, dataset_dir, [("device", device)], "time")
+
+def export_table(data_frame, dataset_dir, partition_cols):
+    # Write analysis results (any pandas DataFrame) partitioned by the given columns
+    # **NOTE** files are named like those written by _write_partition and any existing data in
+    # the partitions being written is deleted so re-exporting replaces rather than appends results
+    pq.write_to_dataset(pa.Table.from_pandas(data_frame, preserve_index=False), dataset_dir,
+                        partition_cols=partition_cols, row_group_size=row_group_size,
+                        basename_template="part-{i}.parquet", existing_data_behavior="delete_matching")
+
+def _filter(min_time=None, max_time=None, **partitions):
+    # Build filter expression from time range and partition values - partitions are
+    # pruned by directory name and row groups by their min/max statistics
+    expression = None
+    terms = [ds.field(k) == v for k, v in sorted(partitions.items()) if v is not None]
+    if min_time is not None:
+        terms.append(ds.field("time") > min_time)
+    if max_time is not None:
+        terms.append(ds.field("time") <= max_time)
+    for t in terms:
+        expression = t if expression is None else (expression & t)
+    return expression
+
+def open_dataset(dataset_dir):
+    return ds.dataset(dataset_dir, format="parquet", partitioning="hive")
+
+def scan(dataset_dir, columns=None, min_time=None, max_time=None, **partitions):
+    """Read table from dataset, only reading partitions and row groups which can match"""
+    return open_dataset(dataset_dir).to_table(columns=columns, filter=_filter(min_time, max_time, **partitions))
+
+def _to_numpy(column):
+    # Zero-copy where column consists of a single chunk without nulls
+    return column.combine_chunks().to_numpy(zero_copy_only=False)
+
+def load_spikes(dataset_dir, simulator, population, min_time=None, max_time=None):
+    table = scan(dataset_dir, ["time", "id"], min_time, max_time,
+                 simulator=simulator, population=population)
+    return _to_numpy(table.column("time")), _to_numpy(table.column("id")).astype(int)
+
+def load_power(dataset_dir, device, min_time=None, max_time=None):
+    table = scan(dataset_dir, ["time", "power"], min_time, max_time, device=device)
+    return _to_numpy(table.column("time")), _to_numpy(table.column("power"))
+
+if __name__ == "__main__":
+    from microcircuit import population_names, read_genn_spikes
+    from nest_spikes import find_shards, load_nest_population
+
+    # Export GeNN and NEST spikes for each population
+    for name in population_names:
+        genn_path = path.join("potjans_spikes", name + ".csv")
+        if path.exists(genn_path):
+            print("Exporting GeNN %s spikes" % name)
+            spike_times, spike_ids = read_genn_spikes(genn_path)
+            export_spikes(spike_times, spike_ids, path.join("columnar", "spikes"), "genn", name)
+
+        if all(path.exists(s) for s in find_shards(path.join("potjans_spikes", "nest"), name)):
+            print("Exporting NEST %s spikes" % name)
+            spike_times, spike_ids = load_nest_population(path.join("potjans_spikes", "nest"), name)
+            export_spikes(spike_times, spike_ids, path.join("columnar", "spikes"), "nest", name)
+
+    # Export power traces for each device
+    for trace_path in sorted(glob(path.join("microcircuit_power", "*.csv"))):
+        device = path.splitext(path.basename(trace_path))[0]
+        print("Exporting %s power trace" % device)
+        trace = np.loadtxt(trace_path, skiprows=1, delimiter=",",
+                           dtype={"names": ("time", "power", ), "formats": (float, float)})
+        export_power(trace["time"], trace["power"], path.join("columnar", "power"), device)
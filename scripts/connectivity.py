@@ -0,0 +1,187 @@
+import numpy as np
+
+# Maximum number of synapses (or bitmask bits) to process at once
+chunk_size = 1 << 24
+
+class ColumnMajor(object):
+    """Column-major view of ragged connectivity: for each postsynaptic neuron, its
+    presynaptic indices and the indices of its synapses in the row-major arrays"""
+    def __init__(self, col_start, pre_ind, remap):
+        self.col_start = col_start
+        self.pre_ind = pre_ind
+        self.remap = remap
+
+    def get_column(self, j):
+        s = self.col_start[j]
+        e = self.col_start[j + 1]
+        return self.pre_ind[s:e], self.remap[s:e]
+
+class RaggedConnectivity(object):
+    """Ragged connectivity (as described in the paper) with rows of postsynaptic
+    indices and weights stored compactly one after another. All arrays are
+    memory-mapped and reductions are performed in chunks of rows so they never
+    need to be fully resident in memory."""
+    def __init__(self, row_length, ind, weight, num_post):
+        self.row_length = row_length
+        self.ind = ind
+        self.weight = weight
+        self.num_post = num_post
+
+        # Calculate where each row starts
+        self.row_start = np.hstack(([0], np.cumsum(row_length, dtype=np.int64)))
+        assert self.row_start[-1] == len(ind)
+        assert weight is None or len(weight) == len(ind)
+
+    @classmethod
+    def from_files(cls, row_length_filename, ind_filename, weight_filename, num_post, weight_dtype=np.float32):
+        row_length = np.memmap(row_length_filename, dtype=np.uint32, mode="r")
+        ind = np.memmap(ind_filename, dtype=np.uint32, mode="r")
+        weight = None if weight_filename is None else np.memmap(weight_filename, dtype=weight_dtype, mode="r")
+        return cls(row_length, ind, weight, num_post)
+
+    @property
+    def num_pre(self):
+        return len(self.row_length)
+
+    @property
+    def num_synapses(self):
+        return self.row_start[-1]
+
+    def _row_blocks(self):
+        # Split rows into blocks containing approximately chunk_size synapses
+        block_starts = np.unique(np.searchsorted(self.row_start[:-1],
+                                                 np.arange(0, self.num_synapses, chunk_size), side="right") - 1)
+        block_ends = np.append(block_starts[1:], self.num_pre)
+        for first, last in zip(block_starts, block_ends):
+            yield first, last, self.row_start[first], self.row_start[last]
+
+    def out_degree(self):
+        return np.asarray(self.row_length, dtype=np.int64)
+
+    def in_degree(self):
+        in_degree = np.zeros(self.num_post, dtype=np.int64)
+        for _, _, s, e in self._row_blocks():
+            in_degree += np.bincount(self.ind[s:e], minlength=self.num_post)
+        return in_degree
+
+    def row_weight_stats(self):
+        """Mean and variance of weights of each presynaptic neuron's synapses"""
+        row_sum = np.zeros(self.num_pre)
+        row_sum_sq = np.zeros(self.num_pre)
+        for first, last, s, e in self._row_blocks():
+            # Sum weights within rows using difference of cumulative sums within block
+            w = np.asarray(self.weight[s:e], dtype=np.float64)
+            local_start = self.row_start[first:last + 1] - s
+            row_sum[first:last] = np.diff(np.hstack(([0.0], np.cumsum(w)))[local_start])
+            row_sum_sq[first:last] = np.diff(np.hstack(([0.0], np.cumsum(w * w)))[local_start])
+
+        return _mean_variance(row_sum, row_sum_sq, self.out_degree())
+
+    def column_weight_stats(self):
+        """Mean and variance of weights of each postsynaptic neuron's synapses"""
+        col_sum = np.zeros(self.num_post)
+        col_sum_sq = np.zeros(self.num_post)
+        for _, _, s, e in self._row_blocks():
+            w = np.asarray(self.weight[s:e], dtype=np.float64)
+            col_sum += np.bincount(self.ind[s:e], weights=w, minlength=self.num_post)
+            col_sum_sq += np.bincount(self.ind[s:e], weights=w * w, minlength=self.num_post)
+
+        return _mean_variance(col_sum, col_sum_sq, self.in_degree())
+
+    def column_major(self, pre_ind_filename=None, remap_filename=None):
+        """Build column-major view using a counting sort over blocks of rows. If filenames
+        are provided, the (large) arrays are written to memory-mapped files"""
+        in_degree = self.in_degree()
+        col_start = np.hstack(([0], np.cumsum(in_degree)))
+
+        # Allocate arrays - in memory or memory-mapped
+        if pre_ind_filename is None:
+            pre_ind = np.empty(self.num_synapses, dtype=np.uint32)
+        else:
+            pre_ind = np.memmap(pre_ind_filename, dtype=np.uint32, mode="w+", shape=(self.num_synapses,))
+        if remap_filename is None:
+            remap = np.empty(self.num_synapses, dtype=np.int64)
+        else:
+            remap = np.memmap(remap_filename, dtype=np.int64, mode="w+", shape=(self.num_synapses,))
+
+        # Next free slot in each column
+        col_fill = col_start[:-1].copy()
+        for first, last, s, e in self._row_blocks():
+            # Stable sort block's synapses by postsynaptic index
+            ind = np.asarray(self.ind[s:e], dtype=np.int64)
+            order = np.argsort(ind, kind="mergesort")
+            sorted_ind = ind[order]
+
+            # Calculate rank of each synapse amongst those in block targetting same column
+            group_start = np.hstack(([0], np.flatnonzero(np.diff(sorted_ind)) + 1))
+            group_length = np.diff(np.append(group_start, len(sorted_ind)))
+            rank = np.arange(len(sorted_ind)) - np.repeat(group_start, group_length)
+
+            # Scatter presynaptic index and synapse index into columns
+            destination = col_fill[sorted_ind] + rank
+            block_pre = np.repeat(np.arange(first, last, dtype=np.uint32), self.row_length[first:last])
+            pre_ind[destination] = block_pre[order]
+            remap[destination] = s + order
+            col_fill += np.bincount(ind, minlength=self.num_post)
+
+        return ColumnMajor(col_start, pre_ind, remap)
+
+class BitmaskConnectivity(object):
+    """Bitmask connectivity (as described in the paper) with one bit per pre x post
+    synapse, packed least-significant bit first into 32-bit words. Rows are not
+    word-aligned so are unpacked in blocks of whole rows."""
+    def __init__(self, words, num_pre, num_post):
+        self.words = words
+        self.num_pre = num_pre
+        self.num_post = num_post
+        assert len(words) == (num_pre * num_post + 31) // 32
+
+    @classmethod
+    def from_file(cls, filename, num_pre, num_post):
+        return cls(np.memmap(filename, dtype="<u4", mode="r"), num_pre, num_post)
+
+    def _row_blocks(self):
+        # Yield blocks of rows unpacked to bits
+        rows_per_block = max(1, chunk_size // self.num_post)
+        for first in range(0, self.num_pre, rows_per_block):
+            last = min(self.num_pre, first + rows_per_block)
+
+            # Unpack words spanning rows and extract exactly the block's bits
+            first_bit = first * self.num_post
+            last_bit = last * self.num_post
+            first_word = first_bit // 32
+            last_word = (last_bit + 31) // 32
+            bits = np.unpackbits(np.asarray(self.words[first_word:last_word]).view(np.uint8), bitorder="little")
+            bits = bits[first_bit - (first_word * 32):last_bit - (first_word * 32)]
+            yield first, last, bits.reshape((last - first, self.num_post))
+
+    def out_degree(self):
+        out_degree = np.empty(self.num_pre, dtype=np.int64)
+        for first, last, bits in self._row_blocks():
+            out_degree[first:last] = bits.sum(axis=1, dtype=np.int64)
+        return out_degree
+
+    def in_degree(self):
+        in_degree = np.zeros(self.num_post, dtype=np.int64)
+        for _, _, bits in self._row_blocks():
+            in_degree += bits.sum(axis=0, dtype=np.int64)
+        return in_degree
+
+    def to_ragged(self, weight=None):
+        """Convert to ragged connectivity (with all weights set to weight)"""
+        row_length = self.out_degree().astype(np.uint32)
+        ind = np.empty(np.sum(row_length), dtype=np.uint32)
+        s = 0
+        for _, _, bits in self._row_blocks():
+            block_ind = np.nonzero(bits)[1]
+            ind[s:s + len(block_ind)] = block_ind
+            s += len(block_ind)
+
+        return RaggedConnectivity(row_length, ind, None if weight is None else np.full(len(ind), weight, dtype=np.float32),
+                                  self.num_post)
+
+def _mean_variance(total, total_sq, count):
+    # Calculate mean and variance from sums, leaving neurons without synapses as NaN
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        return mean, (total_sq / count) - (mean * mean)
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+from os import path
+
+from bit_raster import BitRaster
+from microcircuit import N_full, N_scaling, connectivity_population_names, read_genn_spikes
+from nest_spikes import find_shards, load_nest_population
+
+# Shared time grid - bins correspond to 2ms refractory period (as in BitRaster)
+t_start = 1000.0
+t_stop = 10000.0
+bin_ms = 2.0
+
+def load_populations(spike_dir="potjans_spikes", simulator="genn", names=connectivity_population_names):
+    """Load post-transient spikes of each population, using None for populations
+    whose spikes are missing"""
+    populations = []
+    for name in names:
+        if simulator == "genn":
+            spike_path = path.join(spike_dir, name + ".csv")
+            spikes = read_genn_spikes(spike_path) if path.exists(spike_path) else None
+        else:
+            nest_dir = path.join(spike_dir, "nest")
+            spikes = (load_nest_population(nest_dir, name)
+                      if all(path.exists(s) for s in find_shards(nest_dir, name)) else None)
+
+        if spikes is not None:
+            mask = (spikes[0] >= t_start) & (spikes[0] < t_stop)
+            spikes = (spikes[0][mask], spikes[1][mask])
+        populations.append(spikes)
+    return populations
+
+def get_population_sizes(names=connectivity_population_names):
+    return np.asarray([int(N_full[n[:-1]][n[-1]] * N_scaling) for n in names])
+
+def bin_populations(populations, sizes):
+    """Bin spikes of all populations onto shared time grid with a single bincount,
+    returning populations x bins matrix of rates [spikes/s]"""
+    num_bins = int(np.ceil((t_stop - t_start) / bin_ms))
+    pop_index = np.concatenate([np.full(len(p[0]), i, dtype=np.int64)
+                                for i, p in enumerate(populations) if p is not None] + [np.empty(0, dtype=np.int64)])
+    spike_bins = np.concatenate([((p[0] - t_start) / bin_ms).astype(np.int64)
+                                 for p in populations if p is not None] + [np.empty(0, dtype=np.int64)])
+    counts = np.bincount((pop_index * num_bins) + spike_bins,
+                         minlength=len(populations) * num_bins).reshape((len(populations), num_bins))
+
+    # Convert to rates, leaving missing populations as NaN
+    rates = counts / (sizes[:, np.newaxis] * (bin_ms / 1000.0))
+    rates[[p is None for p in populations]] = np.nan
+    return rates
+
+def rate_cross_correlation(rates, max_lag_bins):
+    """Cross-correlation functions between every pair of population rates, calculated
+    together via FFT. Element [i, j, k] correlates rate i at time t + lag[k] with rate j
+    at time t so a peak at a positive lag means population j leads population i"""
+    num_bins = rates.shape[1]
+
+    # Standardise rates so zero-lag value is Pearson correlation coefficient
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (rates - rates.mean(axis=1, keepdims=True)) / rates.std(axis=1, keepdims=True)
+
+    # Zero-pad to avoid circular wrap-around and multiply spectra of all pairs at once
+    nfft = 1 << int(np.ceil(np.log2(2 * num_bins)))
+    spectra = np.fft.rfft(z, n=nfft, axis=1)
+    xcorr = np.fft.irfft(spectra[:, np.newaxis, :] * np.conj(spectra[np.newaxis, :, :]), n=nfft, axis=2) / num_bins
+
+    # Reorder so lags run from -max_lag_bins to max_lag_bins
+    lags = np.arange(-max_lag_bins, max_lag_bins + 1)
+    return lags * bin_ms, xcorr[:, :, lags % nfft]
+
+def pairwise_correlation(populations, sizes, max_neurons, rng):
+    """Mean Pearson correlation between binned spike trains of sampled pairs of
+    neurons from every pair of populations, calculated from a single BitRaster"""
+    # Sample active neurons from each population and stack them into one raster
+    sample_times = []
+    sample_ids = []
+    sample_pop = []
+    offset = 0
+    for i, (p, num) in enumerate(zip(populations, sizes)):
+        if p is None:
+            continue
+        active = np.unique(p[1])
+        sample = rng.choice(active, min(len(active), max_neurons), replace=False)
+
+        # Map sampled neuron ids to rows of stacked raster
+        row = np.full(num, -1, dtype=np.int64)
+        row[sample] = offset + np.arange(len(sample))
+        mask = (row[p[1]] >= 0)
+        sample_times.append(p[0][mask])
+        sample_ids.append(row[p[1][mask]])
+        sample_pop.append(np.full(len(sample), i, dtype=np.int64))
+        offset += len(sample)
+
+    if offset == 0:
+        return np.full((len(populations), len(populations)), np.nan)
+
+    raster = BitRaster.from_spikes(np.concatenate(sample_times), np.concatenate(sample_ids),
+                                   offset, t_start, t_stop, bin_ms)
+
+    # Average within blocks belonging to each pair of populations using one-hot membership matrix,
+    # accumulating tile by tile so the full correlation matrix is never held in memory
+    membership = np.zeros((offset, len(populations)))
+    membership[np.arange(offset), np.concatenate(sample_pop)] = 1.0
+    total = np.zeros((len(populations), len(populations)))
+    count = np.zeros((len(populations), len(populations)))
+    for b, c, correlation in raster.iter_correlation_blocks():
+        # Exclude self-correlations and undefined correlations
+        rows = np.arange(b, b + correlation.shape[0])
+        cols = np.arange(c, c + correlation.shape[1])
+        valid = np.isfinite(correlation) & (rows[:, np.newaxis] != cols[np.newaxis, :])
+
+        total += membership[rows].T.dot(np.where(valid, correlation, 0.0)).dot(membership[cols])
+        count += membership[rows].T.dot(valid.astype(float)).dot(membership[cols])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return total / count
+
+def calc_coupling(populations, sizes, max_lag_ms=50.0, max_neurons=200, rng=None, names=connectivity_population_names):
+    """Table of rate and pairwise spike coupling between every pair of populations"""
+    rng = np.random.RandomState() if rng is None else rng
+
+    rates = bin_populations(populations, sizes)
+    lag_ms, xcorr = rate_cross_correlation(rates, int(round(max_lag_ms / bin_ms)))
+    pair_corr = pairwise_correlation(populations, sizes, max_neurons, rng)
+
+    # Find lag at which cross-correlation peaks - rates oscillate so troughs are also large in magnitude
+    peak = np.argmax(np.where(np.isfinite(xcorr), xcorr, -np.inf), axis=2)
+    peak_corr = np.take_along_axis(xcorr, peak[:, :, np.newaxis], axis=2)[:, :, 0]
+
+    # Build table with row per (target, source) pair
+    target, source = np.meshgrid(np.arange(len(names)), np.arange(len(names)), indexing="ij")
+    return pd.DataFrame({"target": np.asarray(names)[target.flatten()],
+                         "source": np.asarray(names)[source.flatten()],
+                         "rate_corr": xcorr[:, :, len(lag_ms) // 2].flatten(),
+                         "rate_peak_corr": peak_corr.flatten(),
+                         "rate_peak_lag_ms": np.where(np.isfinite(peak_corr), lag_ms[peak], np.nan).flatten(),
+                         "pair_corr": pair_corr.flatten()})
@@ -0,0 +1,224 @@
+import numpy as np
+import re
+
+from os import path
+
+from scipy.stats import entropy, gaussian_kde, iqr
+
+from elephant.conversion import BinnedSpikeTrain
+from elephant.statistics import isi, cv
+from elephant.spike_train_correlation import corrcoef
+
+from pandas import read_csv
+
+from nest_spikes import load_nest_population
+
+from neo import SpikeTrain
+
+from quantities import s, ms
+
+N_full = {
+  '23': {'E': 20683, 'I': 5834},
+  '4' : {'E': 21915, 'I': 5479},
+  '5' : {'E': 4850, 'I': 1065},
+  '6' : {'E': 14395, 'I': 2948}
+}
+
+# Populations in the order they are stacked in raster plots
+population_names = ["6E", "6I", "5E", "5I", "4E", "4I", "23E", "23I"]
+
+N_scaling = 1.0
+K_scaling = 1.0
+duration = 9.0
+
+# Populations in the order used by the model's connectivity tables (see parameters.h)
+connectivity_population_names = ["23E", "23I", "4E", "4I", "5E", "5I", "6E", "6I"]
+
+# Probabilities for >=1 connection between neurons in the given populations.
+# The first index is for the target population; the second for the source population
+#                                   2/3e    2/3i    4e      4i      5e      5i      6e      6i
+connection_probabilities = np.asarray([[0.1009, 0.1689, 0.0437, 0.0818, 0.0323, 0.0,    0.0076, 0.0],       # 2/3e
+                                       [0.1346, 0.1371, 0.0316, 0.0515, 0.0755, 0.0,    0.0042, 0.0],       # 2/3i
+                                       [0.0077, 0.0059, 0.0497, 0.135,  0.0067, 0.0003, 0.0453, 0.0],       # 4e
+                                       [0.0691, 0.0029, 0.0794, 0.1597, 0.0033, 0.0,    0.1057, 0.0],       # 4i
+                                       [0.1004, 0.0622, 0.0505, 0.0057, 0.0831, 0.3726, 0.0204, 0.0],       # 5e
+                                       [0.0548, 0.0269, 0.0257, 0.0022, 0.06,   0.3158, 0.0086, 0.0],       # 5i
+                                       [0.0156, 0.0066, 0.0211, 0.0166, 0.0572, 0.0197, 0.0396, 0.2252],    # 6e
+                                       [0.0364, 0.001,  0.0034, 0.0005, 0.0277, 0.008,  0.0658, 0.1443]])   # 6i
+
+# Spikes loaded by load_spikes, indexed by filename
+# **NOTE** this lets a long-running process (e.g. analysis_server.py) reuse spikes between figures
+_spike_cache = {}
+
+def read_genn_spikes(spike_path):
+    # Load GeNN spike CSV and convert columns to numpy
+    spikes = read_csv(spike_path, header=None, skiprows=1, delimiter=",",
+                      names=["time", "id"], dtype={"time":float, "id":int})
+    return spikes["time"].values, spikes["id"].values
+
+def load_spikes(filename, spike_dir="potjans_spikes"):
+    # If these spikes have already been loaded, return cached arrays
+    cache_key = (spike_dir, filename, N_scaling)
+    if cache_key in _spike_cache:
+        return _spike_cache[cache_key]
+
+    # Parse filename and use to get population name and size
+    match = re.match("([0-9]+)([EI])\.csv", filename)
+    name = match.group(1) + match.group(2)
+    num = int(N_full[match.group(1)][match.group(2)] * N_scaling)
+
+    # Load spikes
+    spike_times, spike_neuron_id = read_genn_spikes(path.join(spike_dir, filename))
+
+    post_transient = (spike_times > 1000.0)
+    spike_times = spike_times[post_transient]
+    spike_neuron_id = spike_neuron_id[post_transient]
+
+    # Load NEST spikes, merging per-virtual process files if present
+    # **NOTE** retrospectively using NEO for all spike io would be better
+    nest_spike_times, nest_spike_neuron_id = load_nest_population(path.join(spike_dir, "nest"), name)
+    nest_post_transient = (nest_spike_times > 1000.0)
+    nest_spike_times = nest_spike_times[nest_post_transient]
+    nest_spike_neuron_id = nest_spike_neuron_id[nest_post_transient]
+
+    result = (spike_times, spike_neuron_id, name, num, nest_spike_times, nest_spike_neuron_id)
+    _spike_cache[cache_key] = result
+    return result
+
+def get_num_neurons(N_scaling=N_scaling):
+    # Number of neurons in each population in connectivity order
+    return np.asarray([int(N_full[name[:-1]][name[-1]] * N_scaling)
+                       for name in connectivity_population_names])
+
+def get_num_connections(N_scaling=N_scaling, K_scaling=K_scaling):
+    # Full-scale number of neurons in each population
+    num_full = get_num_neurons(1.0).astype(float)
+    num_pairs = np.outer(num_full, num_full)
+
+    # Calculate full-scale in-degree of each projection (as in Parameters::getFullNumInputs)
+    num_inputs = np.round(np.log(1.0 - connection_probabilities) / np.log((num_pairs - 1.0) / num_pairs)) / num_full[:, np.newaxis]
+
+    # Scale and multiply by number of postsynaptic neurons (as in Parameters::getScaledNumConnections)
+    # **NOTE** matrix is indexed by target then source population
+    return np.round(num_inputs * K_scaling * get_num_neurons(N_scaling)[:, np.newaxis]).astype(np.int64)
+
+def calc_synaptic_events(spike_counts, N_scaling=N_scaling, K_scaling=K_scaling):
+    # Mean out-degree of each source population onto each target population
+    # **NOTE** connectivity is fixed-total-number so only the mean out-degree is known without the actual connectivity
+    num_connections = get_num_connections(N_scaling, K_scaling)
+    out_degree = num_connections / get_num_neurons(N_scaling)[np.newaxis, :].astype(float)
+
+    # Each spike emitted by a source population causes out-degree events in each target population
+    return out_degree * np.asarray(spike_counts, dtype=float)[np.newaxis, :]
+
+def count_spikes(spike_dir="potjans_spikes"):
+    # Spikes from every population are required as each contributes synaptic events
+    spike_paths = [path.join(spike_dir, name + ".csv") for name in connectivity_population_names]
+    missing = [p for p in spike_paths if not path.exists(p)]
+    if len(missing) > 0:
+        raise IOError("Cannot count synaptic events - spikes missing for %s" % ", ".join(missing))
+
+    # Count all (including transient) spikes emitted by each population in connectivity order
+    return np.asarray([len(read_genn_spikes(p)[0]) for p in spike_paths])
+
+def calc_histogram(data, smoothing, bin_x=None):
+    if bin_x is None:
+        # Calculate bin-size using Freedman-Diaconis rule
+        bin_size = (2.0 * iqr(data)) / (float(len(data)) ** (1.0 / 3.0))
+
+        # Get range of data
+        min_y = np.amin(data)
+        max_y = np.amax(data)
+
+        # Calculate number of bins, rounding up to get right edge
+        num_bins = np.ceil((max_y - min_y) / bin_size)
+
+        # Create range of bin x coordinates
+        bin_x = np.arange(min_y, min_y + (num_bins * bin_size), bin_size)
+
+    # Create kernel density estimator of data
+    data_kde = gaussian_kde(data, smoothing)
+
+    # Use to generate smoothed histogram
+    hist_smooth = data_kde.evaluate(bin_x)
+
+    # Normalise histogram and return
+    hist_normalised = hist_smooth / np.sum(hist_smooth) / (bin_x[1] - bin_x[0])
+    return bin_x, hist_normalised
+
+def calc_rate_hist(spike_times, spike_ids, num, duration, bin_x=None):
+     # Calculate histogram of spike IDs to get each neuron's firing rate
+    rate, _ = np.histogram(spike_ids, bins=range(num + 1))
+    assert len(rate) == num
+    rate = np.divide(rate, duration, dtype=float)
+
+    return calc_histogram(rate, 0.3, bin_x)
+
+def calc_cv_isi_hist(spike_times, spike_ids, num, duration, bin_x=None):
+    # Loop through neurons
+    cv_isi = []
+    for n in range(num):
+        # Get mask of spikes from this neuron and use to extract their times
+        mask = (spike_ids == n)
+        neuron_spike_times = spike_times[mask]
+
+        # If this neuron spiked more than once i.e. it is possible to calculate ISI!
+        if len(neuron_spike_times) > 1:
+            cv_isi.append(cv(isi(neuron_spike_times)))
+
+    return calc_histogram(cv_isi, 0.04, bin_x)
+
+def calc_corellation(spike_times, spike_ids, num, duration, bin_x=None):
+    # Create randomly shuffled indices
+    neuron_indices = np.arange(num)
+    np.random.shuffle(neuron_indices)
+
+    # Loop through indices
+    spike_trains = []
+    for n in neuron_indices:
+        # Extract spike times
+        neuron_spike_times = spike_times[spike_ids == n]
+
+        # If there are any spikes
+        if len(neuron_spike_times) > 0:
+            # Add neo SpikeTrain object
+            spike_trains.append(SpikeTrain(neuron_spike_times * ms, t_start=1*s, t_stop=10*s))
+
+            # If we have found our 200 spike trains, stop
+            if len(spike_trains) == 200:
+                break
+
+    # Check that 200 spike trains containing spikes could be found
+    assert len(spike_trains) == 200
+
+    # Bin spikes using bins corresponding to 2ms refractory period
+    binned_spike_trains = BinnedSpikeTrain(spike_trains, binsize=2.0 * ms)
+
+    # Calculate correlation matrix
+    correlation = corrcoef(binned_spike_trains)
+
+    # Take lower triangle of matrix (minus diagonal)
+    correlation_non_disjoint = correlation[np.tril_indices_from(correlation, k=-1)]
+
+    # Calculate histogram
+    return calc_histogram(correlation_non_disjoint, 0.002, bin_x)
+
+def calc_kl(nest_hist, hist):
+    # Create a mask to select bins where the GeNN simulation has non-negligible values
+    bin_mask = (hist > 1.0E-15)
+
+    # Calculate KL divergence
+    return entropy(nest_hist[bin_mask], hist[bin_mask])
+
+def calc_population_kl(spike_times, spike_ids, num, nest_spike_times, nest_spike_ids):
+    # Calculate statistics (using precise NEST stats to determine bins)
+    rate_bin_x, nest_rate_hist = calc_rate_hist(nest_spike_times, nest_spike_ids, num, duration)
+    _, rate_hist = calc_rate_hist(spike_times, spike_ids, num, duration, bin_x=rate_bin_x)
+    isi_bin_x, nest_isi_hist = calc_cv_isi_hist(nest_spike_times, nest_spike_ids, num, duration)
+    _, isi_hist = calc_cv_isi_hist(spike_times, spike_ids, num, duration, bin_x=isi_bin_x)
+    corr_bin_x, nest_corr_hist = calc_corellation(nest_spike_times, nest_spike_ids, num, duration)
+    _, corr_hist = calc_corellation(spike_times, spike_ids, num, duration, bin_x=corr_bin_x)
+
+    return {"rate": (rate_bin_x, nest_rate_hist, rate_hist, calc_kl(nest_rate_hist, rate_hist)),
+            "isi": (isi_bin_x, nest_isi_hist, isi_hist, calc_kl(nest_isi_hist, isi_hist)),
+            "corr": (corr_bin_x, nest_corr_hist, corr_hist, calc_kl(nest_corr_hist, corr_hist))}
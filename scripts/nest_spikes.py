@@ -0,0 +1,136 @@
+import numpy as np
+
+from functools import partial
+from glob import glob
+from multiprocessing import Pool
+from os import path
+from pandas import read_csv
+
+# Order in which NEST creates populations and hence lists them in population_nodeids.dat
+nest_population_order = ["23E", "23I", "4E", "4I", "5E", "5I", "6E", "6I"]
+
+def read_nest_spikes(spike_path):
+    # Load pre-merged NEST spikes (time and 0-based neuron index) and convert columns to numpy
+    spikes = read_csv(spike_path, header=None, comment="#", delimiter="\t",
+                      names=["time", "id"], dtype={"time":float, "id":int})
+    return spikes["time"].values, spikes["id"].values
+
+def _count_header_lines(shard_path):
+    # Count comment lines and, in NEST 3 .dat files, the uncommented "sender time_ms" column header
+    with open(shard_path, "r") as shard_file:
+        for i, line in enumerate(shard_file):
+            if not line.startswith("#"):
+                fields = line.split()
+                return i if len(fields) == 0 or fields[0].isdigit() else i + 1
+    return 0
+
+def read_nest_shard(shard_path, first_gid):
+    # Load raw per-virtual process NEST output with global sender GID and time columns
+    # and convert GIDs into 0-based neuron indices within population
+    spikes = read_csv(shard_path, header=None, skiprows=_count_header_lines(shard_path), comment="#",
+                      delimiter=r"\s+", usecols=[0, 1], names=["sender", "time"],
+                      dtype={"sender":int, "time":float})
+    return spikes["time"].values, spikes["sender"].values - first_gid
+
+def read_first_gid(nest_dir, name):
+    # NEST writes first and last GID of each population, in creation order, to population_nodeids.dat
+    nodeids_path = path.join(nest_dir, "population_nodeids.dat")
+    if not path.exists(nodeids_path):
+        raise IOError("Population %s has raw NEST shards but its first GID is unknown - "
+                      "pass first_gid or provide %s" % (name, nodeids_path))
+    nodeids = np.atleast_2d(np.loadtxt(nodeids_path, dtype=int))
+    return int(nodeids[nest_population_order.index(name), 0])
+
+def read_sorted_nest_spikes(spike_path, first_gid=None):
+    spike_times, spike_ids = (read_nest_spikes(spike_path) if first_gid is None
+                              else read_nest_shard(spike_path, first_gid))
+
+    # Each shard should be sorted by time but, if it isn't, sort it
+    if np.any(spike_times[1:] < spike_times[:-1]):
+        order = np.argsort(spike_times, kind="mergesort")
+        spike_times = spike_times[order]
+        spike_ids = spike_ids[order]
+    return spike_times, spike_ids
+
+def find_shards(nest_dir, name):
+    # NEST writes one file per virtual process (and hence per MPI rank) named
+    # <label>-<gid>-<vp>.<ext> - otherwise there will be a single, pre-merged file
+    shards = sorted(glob(path.join(nest_dir, "spikes_L" + name + "-*.dat")) +
+                    glob(path.join(nest_dir, "spikes_L" + name + "-*.gdf")))
+    if len(shards) == 0:
+        shards = [path.join(nest_dir, "spikes_L" + name + ".dat")]
+    return shards
+
+def _merge_pair(a, b):
+    a_times, a_ids = a
+    b_times, b_ids = b
+
+    # Find where each element of b goes in merged array - placing it after equal times in a keeps merge stable
+    b_position = np.searchsorted(a_times, b_times, side="right") + np.arange(len(b_times))
+    a_mask = np.ones(len(a_times) + len(b_times), dtype=bool)
+    a_mask[b_position] = False
+
+    # Scatter both arrays into merged arrays
+    times = np.empty(len(a_mask), dtype=a_times.dtype)
+    ids = np.empty(len(a_mask), dtype=a_ids.dtype)
+    times[b_position] = b_times
+    ids[b_position] = b_ids
+    times[a_mask] = a_times
+    ids[a_mask] = a_ids
+    return times, ids
+
+def merge_sorted(shards):
+    # Merge pairs of sorted shards until only one remains - O(n log k) without re-sorting
+    shards = list(shards)
+    if len(shards) == 0:
+        return np.empty(0), np.empty(0, dtype=int)
+    while len(shards) > 1:
+        merged = [_merge_pair(shards[i], shards[i + 1]) for i in range(0, len(shards) - 1, 2)]
+        if len(shards) % 2 == 1:
+            merged.append(shards[-1])
+        shards = merged
+    return shards[0]
+
+def iter_merged(shards, block_ms=1000.0):
+    # Yield time-sorted blocks of spikes, merging only the parts of each shard within each block
+
+    # Find time of last spike in any shard
+    end_time = max([times[-1] for times, _ in shards if len(times) > 0] + [0.0])
+
+    shard_start = [0] * len(shards)
+    block_end = block_ms
+    while True:
+        block = []
+        for i, (times, ids) in enumerate(shards):
+            e = np.searchsorted(times, block_end, side="left")
+            block.append((times[shard_start[i]:e], ids[shard_start[i]:e]))
+            shard_start[i] = e
+
+        yield merge_sorted(block)
+
+        if block_end > end_time:
+            break
+        block_end += block_ms
+
+def read_shards(shard_paths, num_processes=None, first_gid=None):
+    # Parse shards in parallel - raw shards if population's first GID is specified, otherwise pre-merged files
+    if len(shard_paths) == 1:
+        return [read_sorted_nest_spikes(shard_paths[0], first_gid)]
+    else:
+        pool = Pool(num_processes)
+        try:
+            return pool.map(partial(read_sorted_nest_spikes, first_gid=first_gid), shard_paths)
+        finally:
+            pool.close()
+            pool.join()
+
+def load_nest_population(nest_dir, name, num_processes=None, first_gid=None):
+    # Find all shards of population
+    shard_paths = find_shards(nest_dir, name)
+
+    # If these are raw per-virtual process files, rather than pre-merged file, look up population's first GID
+    if shard_paths != [path.join(nest_dir, "spikes_L" + name + ".dat")] and first_gid is None:
+        first_gid = read_first_gid(nest_dir, name)
+
+    # Load and merge
+    return merge_sorted(read_shards(shard_paths, num_processes, first_gid))
@@ -3,8 +3,12 @@ import numpy as np
 import seaborn as sns
 import plot_settings
 import utils
+from connectivity import RaggedConnectivity
+from os import path
 from scipy.stats import norm
 
+num_excitatory = 90000
+
 # Load weights
 weights = np.fromfile("mad_data/weights.bin", dtype=np.float32)
 
@@ -21,6 +25,22 @@ hist, bin_x = np.histogram(weights, bins=np.arange(min_weight, max_weight, 0.75)
 
 print("Min:%f, max:%f, median:%f, mean:%f, sd:%f" % (min_weight, max_weight, median_weight, mean_weight, std_weight))
 
+# If connectivity was also written, analyse weights of each postsynaptic neuron
+if path.exists("mad_data/row_lengths.bin") and path.exists("mad_data/indices.bin"):
+    connectivity = RaggedConnectivity.from_files("mad_data/row_lengths.bin", "mad_data/indices.bin",
+                                                 "mad_data/weights.bin", num_excitatory)
+    post_mean_weight, post_var_weight = connectivity.column_weight_stats()
+    in_degree = connectivity.in_degree()
+
+    # Convert from nA to pA
+    post_mean_weight *= 1000.0
+    post_var_weight *= 1000.0 * 1000.0
+
+    print("In-degree min:%u, max:%u, mean:%f" % (np.amin(in_degree), np.amax(in_degree), np.average(in_degree)))
+    print("Postsynaptic mean weight min:%f, max:%f, sd:%f" % (np.nanmin(post_mean_weight), np.nanmax(post_mean_weight),
+                                                              np.nanstd(post_mean_weight)))
+    print("Mean within-neuron weight sd:%f" % np.nanmean(np.sqrt(post_var_weight)))
+
 # Convert bin edges to bin centres
 bin_centre_x = bin_x[:-1] + ((bin_x[1:] - bin_x[:-1]) * 0.5)
 
@@ -42,5 +62,5 @@ axis.set_ylabel("Fraction of synapses")
 utils.remove_axis_junk(axis)
 
 fig.tight_layout(pad=0.0)
-fig.savefig("../figures/mad_weights.eps")
+utils.save_vector_figure(fig, "../figures/mad_weights.pdf")
 plt.show()
@@ -3,152 +3,14 @@ import matplotlib.gridspec as gs
 import seaborn as sns
 import numpy as np
 import plot_settings
-import re
 import utils
 
-from os import path
+from microcircuit import calc_population_kl, load_spikes
 
-from scipy.stats import entropy, gaussian_kde, iqr
-
-from elephant.conversion import BinnedSpikeTrain
-from elephant.statistics import isi, cv
-from elephant.spike_train_correlation import corrcoef
-
-from pandas import read_csv
-
-from neo import SpikeTrain
-
-from quantities import s, ms
-
-N_full = {
-  '23': {'E': 20683, 'I': 5834},
-  '4' : {'E': 21915, 'I': 5479},
-  '5' : {'E': 4850, 'I': 1065},
-  '6' : {'E': 14395, 'I': 2948}
-}
-
-N_scaling = 1.0
-duration = 9.0
 raster_plot_step = 20
 raster_plot_start_ms = 1000.0
 raster_plot_end_ms = 2000.0
 
-def load_spikes(filename):
-    # Parse filename and use to get population name and size
-    match = re.match("([0-9]+)([EI])\.csv", filename)
-    name = match.group(1) + match.group(2)
-    num = int(N_full[match.group(1)][match.group(2)] * N_scaling)
-
-    # Load spikes
-    spike_path = path.join("potjans_spikes", filename)
-    spikes = read_csv(spike_path, header=None, skiprows=1, delimiter=",",
-                      names=["time", "id"], dtype={"time":float, "id":int})
-
-    # Convert CSV columns to numpy
-    spike_times = spikes["time"].values
-    spike_neuron_id = spikes["id"].values
-
-    post_transient = (spike_times > 1000.0)
-    spike_times = spike_times[post_transient]
-    spike_neuron_id = spike_neuron_id[post_transient]
-
-    # Load NEST spikes
-    # **NOTE** retrospectively using NEO for all spike io would be better
-    nest_spike_path = path.join("potjans_spikes", "nest", "spikes_L" + name + ".dat")
-    nest_spikes = read_csv(nest_spike_path, header=None, comment="#", delimiter="\t",
-                           names=["time", "id"], dtype={"time":float, "id":int})
-
-    # Convert CSV columns to numpy
-    nest_spike_times = nest_spikes["time"].values
-    nest_spike_neuron_id = nest_spikes["id"].values
-    nest_post_transient = (nest_spike_times > 1000.0)
-    nest_spike_times = nest_spike_times[nest_post_transient]
-    nest_spike_neuron_id = nest_spike_neuron_id[nest_post_transient]
-
-    return spike_times, spike_neuron_id, name, num, nest_spike_times, nest_spike_neuron_id
-
-def calc_histogram(data, smoothing, bin_x=None):
-    if bin_x is None:
-        # Calculate bin-size using Freedman-Diaconis rule
-        bin_size = (2.0 * iqr(data)) / (float(len(data)) ** (1.0 / 3.0))
-
-        # Get range of data
-        min_y = np.amin(data)
-        max_y = np.amax(data)
-
-        # Calculate number of bins, rounding up to get right edge
-        num_bins = np.ceil((max_y - min_y) / bin_size)
-
-        # Create range of bin x coordinates
-        bin_x = np.arange(min_y, min_y + (num_bins * bin_size), bin_size)
-
-    # Create kernel density estimator of data
-    data_kde = gaussian_kde(data, smoothing)
-
-    # Use to generate smoothed histogram
-    hist_smooth = data_kde.evaluate(bin_x)
-
-    # Normalise histogram and return
-    hist_normalised = hist_smooth / np.sum(hist_smooth) / (bin_x[1] - bin_x[0])
-    return bin_x, hist_normalised
-
-def calc_rate_hist(spike_times, spike_ids, num, duration, bin_x=None):
-     # Calculate histogram of spike IDs to get each neuron's firing rate
-    rate, _ = np.histogram(spike_ids, bins=range(num + 1))
-    assert len(rate) == num
-    rate = np.divide(rate, duration, dtype=float)
-    
-    return calc_histogram(rate, 0.3, bin_x)
-
-def calc_cv_isi_hist(spike_times, spike_ids, num, duration, bin_x=None):
-    # Loop through neurons
-    cv_isi = []
-    for n in range(num):
-        # Get mask of spikes from this neuron and use to extract their times
-        mask = (spike_ids == n)
-        neuron_spike_times = spike_times[mask]
-        
-        # If this neuron spiked more than once i.e. it is possible to calculate ISI!
-        if len(neuron_spike_times) > 1:
-            cv_isi.append(cv(isi(neuron_spike_times)))
-
-    return calc_histogram(cv_isi, 0.04, bin_x)
-
-def calc_corellation(spike_times, spike_ids, num, duration, bin_x=None):
-    # Create randomly shuffled indices
-    neuron_indices = np.arange(num)
-    np.random.shuffle(neuron_indices)
-
-    # Loop through indices
-    spike_trains = []
-    for n in neuron_indices:
-        # Extract spike times
-        neuron_spike_times = spike_times[spike_ids == n]
-
-        # If there are any spikes
-        if len(neuron_spike_times) > 0:
-            # Add neo SpikeTrain object
-            spike_trains.append(SpikeTrain(neuron_spike_times * ms, t_start=1*s, t_stop=10*s))
-
-            # If we have found our 200 spike trains, stop
-            if len(spike_trains) == 200:
-                break
-
-    # Check that 200 spike trains containing spikes could be found
-    assert len(spike_trains) == 200
-
-    # Bin spikes using bins corresponding to 2ms refractory period
-    binned_spike_trains = BinnedSpikeTrain(spike_trains, binsize=2.0 * ms)
-
-    # Calculate correlation matrix
-    correlation = corrcoef(binned_spike_trains)
-
-    # Take lower triangle of matrix (minus diagonal)
-    correlation_non_disjoint = correlation[np.tril_indices_from(correlation, k=-1)]
-
-    # Calculate histogram
-    return calc_histogram(correlation_non_disjoint, 0.002, bin_x)
-
 pop_spikes = [load_spikes("6E.csv"),
               load_spikes("6I.csv"),
               load_spikes("5E.csv"),
@@ -203,23 +65,15 @@ for i, (spike_times, spike_ids, name, num, nest_spike_times, nest_spike_ids) in
     plot_mask = ((spike_ids % raster_plot_step) == 0) & (spike_times > raster_plot_start_ms) & (spike_times <= raster_plot_end_ms)
     raster_axis.scatter(spike_times[plot_mask], spike_ids[plot_mask] + neuron_id_offset[i], s=1, edgecolors="none")
 
-    # Calculate statistics (using precise NEST stats to determine bins)
-    rate_bin_x, nest_rate_hist = calc_rate_hist(nest_spike_times, nest_spike_ids, num, duration)
-    _, rate_hist = calc_rate_hist(spike_times, spike_ids, num, duration, bin_x=rate_bin_x)
-    isi_bin_x, nest_isi_hist = calc_cv_isi_hist(nest_spike_times, nest_spike_ids, num, duration)
-    _, isi_hist = calc_cv_isi_hist(spike_times, spike_ids, num, duration, bin_x=isi_bin_x)
-    corr_bin_x, nest_corr_hist = calc_corellation(nest_spike_times, nest_spike_ids, num, duration)
-    _, corr_hist = calc_corellation(spike_times, spike_ids, num, duration, bin_x=corr_bin_x)
-
-    # Create a mask to select bins where the GeNN simulation has non-negligible values
-    rate_bin_mask = (rate_hist > 1.0E-15)
-    isi_bin_mask = (isi_hist > 1.0E-15)
-    corr_bin_mask = (corr_hist > 1.0E-15)
+    # Calculate statistics and KL divergence (using precise NEST stats to determine bins)
+    pop_kl = calc_population_kl(spike_times, spike_ids, num, nest_spike_times, nest_spike_ids)
+    rate_bin_x, nest_rate_hist, rate_hist, pop_rate_kl = pop_kl["rate"]
+    isi_bin_x, nest_isi_hist, isi_hist, pop_isi_kl = pop_kl["isi"]
+    corr_bin_x, nest_corr_hist, corr_hist, pop_corr_kl = pop_kl["corr"]
 
-    # Calculate KL divergence
-    rate_kl.append(entropy(nest_rate_hist[rate_bin_mask], rate_hist[rate_bin_mask]))
-    isi_kl.append(entropy(nest_isi_hist[isi_bin_mask], isi_hist[isi_bin_mask]))
-    corr_kl.append(entropy(nest_corr_hist[corr_bin_mask], corr_hist[corr_bin_mask]))
+    rate_kl.append(pop_rate_kl)
+    isi_kl.append(pop_isi_kl)
+    corr_kl.append(pop_corr_kl)
 
     assert np.isfinite(rate_kl[-1])
     assert np.isfinite(isi_kl[-1])
@@ -410,7 +264,7 @@ kl_fig.legend([seeds_actor, nest_actor, spinnaker_actor, genn_actor],
               ncol=2, loc="lower center")
 
 kl_fig.tight_layout(pad=0, rect=(0, 0.15, 1, 1))
-kl_fig.savefig("../figures/microcircuit_accuracy_kl.eps")
+utils.save_vector_figure(kl_fig, "../figures/microcircuit_accuracy_kl.pdf")
 
 # Show plot
 plt.show()
@@ -0,0 +1,61 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import plot_settings
+import utils
+
+from coupling import calc_coupling, get_population_sizes, load_populations
+from microcircuit import connectivity_population_names
+
+# Statistics to show as heatmaps and the symmetric range of their colour maps
+heatmap_stats = [("pair_corr", "Pairwise corr. coef.", 0.005),
+                 ("rate_peak_corr", "Peak rate corr. coef.", 1.0),
+                 ("rate_peak_lag_ms", "Peak lag [ms]", 10.0)]
+
+sizes = get_population_sizes()
+
+# Calculate coupling between all populations in GeNN and NEST runs
+coupling = []
+for simulator in ["genn", "nest"]:
+    table = calc_coupling(load_populations("potjans_spikes", simulator), sizes, rng=np.random.RandomState(1234))
+    table.insert(0, "simulator", simulator)
+    coupling.append(table)
+coupling = pd.concat(coupling, ignore_index=True)
+
+# Save and show compact table
+coupling.to_csv("microcircuit_coupling.csv", index=False, float_format="%.6g")
+print(coupling.dropna(how="all", subset=[s for s, _, _ in heatmap_stats]).to_string(index=False, float_format="%.4f"))
+
+fig, axes = plt.subplots(2, len(heatmap_stats), sharex="col", sharey="row",
+                         figsize=(plot_settings.double_column_width, 110.0 * plot_settings.mm_to_inches),
+                         frameon=False)
+
+num_pops = len(connectivity_population_names)
+for row, simulator in enumerate(["genn", "nest"]):
+    sim_coupling = coupling[coupling["simulator"] == simulator]
+    for col, (stat, label, limit) in enumerate(heatmap_stats):
+        # Table rows are in (target, source) order so reshape directly into matrix
+        matrix = sim_coupling[stat].values.reshape((num_pops, num_pops))
+        # **NOTE** pcolormesh rather than imshow so cells are drawn as vector quads rather than resampled images
+        image = axes[row, col].pcolormesh(np.ma.masked_invalid(matrix), cmap="RdBu_r", vmin=-limit, vmax=limit)
+
+        utils.remove_axis_junk(axes[row, col])
+        axes[row, col].set_xticks(np.arange(num_pops) + 0.5)
+        axes[row, col].set_yticks(np.arange(num_pops) + 0.5)
+        axes[row, col].set_xticklabels(connectivity_population_names, rotation=90)
+        axes[row, col].set_yticklabels(connectivity_population_names)
+
+        if row == 0:
+            axes[row, col].set_title(label)
+        else:
+            axes[row, col].set_xlabel("Source")
+            fig.colorbar(image, ax=axes[:, col], orientation="horizontal", fraction=0.05, pad=0.2,
+                         ticks=[-limit, 0.0, limit])
+
+    axes[row, 0].invert_yaxis()
+    axes[row, 0].set_ylabel("%s\nTarget" % ("GeNN" if simulator == "genn" else "NEST 'precise'"))
+
+# Save figure
+utils.save_vector_figure(fig, "../figures/microcircuit_coupling.pdf")
+
+plt.show()
@@ -1,12 +1,20 @@
+import csv
 import matplotlib.pyplot as plt
 import numpy as np
+import os
 import plot_settings
 import utils
 
-# CSV filename, 'idle' power, sim time, spike write time
-data = [("microcircuit_power/k40c.csv", 120.0, 140.0, 41911.5, 6199.62),
-        ("microcircuit_power/1050ti.csv", 80.0, 80.0, 137592, 15054),
-        ("microcircuit_power/tx2.csv", 6.0, 6.0, 258350, 14516.2)]
+from microcircuit import calc_synaptic_events, count_spikes
+
+# CSV filename, 'idle' power, sim time, spike write time, directory containing spikes recorded during run
+# **NOTE** if no spike directory is specified, the total synaptic event count measured for the paper is used
+data = [("microcircuit_power/k40c.csv", 120.0, 140.0, 41911.5, 6199.62, None),
+        ("microcircuit_power/1050ti.csv", 80.0, 80.0, 137592, 15054, None),
+        ("microcircuit_power/tx2.csv", 6.0, 6.0, 258350, 14516.2, None)]
+
+# Total synaptic events measured for the paper
+reference_synaptic_events = 938037605 * 10
 
 
 fig, axes = plt.subplots(len(data), figsize=(plot_settings.column_width, 90.0 * plot_settings.mm_to_inches), sharex=True)
@@ -14,7 +22,8 @@ fig, axes = plt.subplots(len(data), figsize=(plot_settings.column_width, 90.0 *
 # How long to plot idle time for
 idle_time_s = 10.0
 
-total_synaptic_events = 938037605 * 10
+# Synaptic event rate and energy per event of each device
+event_table = []
 
 idle_actor = None
 init_actor = None
@@ -23,6 +32,12 @@ spike_write_actor = None
 
 # Loop through devices
 for i, (d, a) in enumerate(zip(data, axes)):
+    # Count synaptic events from spikes emitted by each population during this run and the model's connectivity
+    if d[5] is None:
+        total_synaptic_events = reference_synaptic_events
+    else:
+        total_synaptic_events = np.sum(calc_synaptic_events(count_spikes(d[5])))
+
     # Load trace
     trace = np.loadtxt(d[0], skiprows=1, delimiter=",",
                        dtype={"names": ("time", "power", ), "formats": (float, float)})
@@ -85,22 +100,33 @@ for i, (d, a) in enumerate(zip(data, axes)):
                           time[sim_start_index:exp_end_index])
     energy_per_synaptic_event = sim_energy/ float(total_synaptic_events)
 
+    synaptic_events_per_second = total_synaptic_events / (d[3] / 1000.0)
+    event_table.append((os.path.splitext(os.path.basename(d[0]))[0], total_synaptic_events, synaptic_events_per_second, energy_per_synaptic_event))
+
     print("%s:" % (d[0]))
+    print("\tSynaptic events = %u" % total_synaptic_events)
     print("\tIdle power = %fW" % (idle_power))
     print("\tEnergy to solution = %fJ = %fkWh" % (energy_to_solution, energy_to_solution / 3600000.0))
     print("\tSimulation energy = %fJ = %fkWh" % (sim_energy, sim_energy / 3600000.0))
     print("\tEnergy per synaptic event = %fuJ" % (energy_per_synaptic_event * 1E6))
+    print("\tSynaptic events per second = %f" % synaptic_events_per_second)
 
     a.axvline(0.0, color="black", linestyle="--", linewidth=1.0)
     a.axvline(exp_end_time - exp_start_time, color="black", linestyle="--", linewidth=1.0)
     a.set_ylabel("Power [W]")
 
+# Write per-device synaptic event rate and energy per event
+with open("microcircuit_power_events.csv", "w") as event_file:
+    event_writer = csv.writer(event_file, delimiter=",")
+    event_writer.writerow(["device", "synaptic_events", "events_s", "J_per_event"])
+    event_writer.writerows(event_table)
+
 axes[-1].set_xlabel("Simulation time [s]")
 
 fig.legend([idle_actor, init_actor, sim_actor, spike_write_actor],
            ["Idle", "Initialisation", "Simulation", "Spike writing"],
            loc="lower center", ncol=2)
 fig.tight_layout(pad=0.0, rect=(0.0, 0.125, 1.0, 1.0))
-fig.savefig("../figures/microcircuit_power.eps")
+utils.save_vector_figure(fig, "../figures/microcircuit_power.pdf")
 plt.show()
 
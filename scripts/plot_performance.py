@@ -151,7 +151,7 @@ def plot(data, filename, num_ref, calc_overhead, legend_text, real_time_s=None,
     # Set tight layout and save
     fig.tight_layout(pad=0, rect=tight_layout_rect)
     if not plot_settings.presentation:
-        fig.savefig(filename)
+        utils.save_vector_figure(fig, filename)
 
 # neuron simulation, synapse simulation, Total simulation time,
 microcircuit_data = [("Jetson TX2", 99570.4, 155284, 258350),
@@ -178,13 +178,13 @@ stdp_data = [("Tesla K40c\nBitmask", 529559, 754827, 9149110, 10530000),
              ("Tesla V100\nBitmask", 120379, 206731, 710839, 1118660),
              ("Tesla V100\nStandard", 120446, 210367, 715422, 1127640)]
 
-plot(microcircuit_init_data, "../figures/microcircuit_init_performance.eps", 2, False,
+plot(microcircuit_init_data, "../figures/microcircuit_init_performance.pdf", 2, False,
      None, None, 2, True)
 
-plot(microcircuit_data, "../figures/microcircuit_performance.eps", 2, True,
+plot(microcircuit_data, "../figures/microcircuit_performance.pdf", 2, True,
      ["Neuron simulation", "Synapse simulation", "Overhead"], 10.0)
 
-plot(stdp_data, "../figures/stdp_performance.eps", 0, True,
+plot(stdp_data, "../figures/stdp_performance.pdf", 0, True,
      ["Neuron simulation", "Synapse simulation", "Postsynaptic learning", "Overhead"], 200.0)
 
 plt.show()
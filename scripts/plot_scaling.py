@@ -25,5 +25,5 @@ fig.legend(actors, [n for n, _ in data],
            loc="lower center", ncol=2)
 fig.tight_layout(pad=0, rect=[0.0, 0.15, 1.0, 1.0])
 if not plot_settings.presentation:
-    fig.savefig("../figures/microcircuit_scaling.eps")
+    utils.save_vector_figure(fig, "../figures/microcircuit_scaling.pdf")
 plt.show()
\ No newline at end of file
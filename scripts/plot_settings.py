@@ -16,4 +16,8 @@ sns.set_context(rc={"lines.markeredgewidth": 1.0})
 
 mm_to_inches = 0.039370079
 column_width = 85.0 * mm_to_inches
-double_column_width = 180.0 * mm_to_inches
\ No newline at end of file
+double_column_width = 180.0 * mm_to_inches
+
+# Artists with more vertices than this are rasterized (at rasterize_dpi) in vector figures
+rasterize_vertex_threshold = 2000
+rasterize_dpi = 600
\ No newline at end of file
@@ -0,0 +1,147 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+from itertools import islice
+
+# Number of lines to parse at once
+chunk_lines = 64 * 1024
+
+# Regular expressions matching tegrastats timestamps and power rails in both older
+# e.g. "VDD_IN 3712/3712" or "POM_5V_GPU 152/152" and newer e.g. "VDD_GPU_SOC 2388mW/2388mW" L4T formats
+tegrastats_timestamp_regex = r"^(\d{2}-\d{2}-\d{4} \d{2}:\d{2}:\d{2})"
+tegrastats_rail_regex = r"((?:VDDQ?|VIN|POM)_\w+) (\d+)(?:mW)?/\d+(?:mW)?"
+
+# Rails which measure total board power
+tegrastats_total_rails = ["VDD_IN", "POM_5V_IN", "VIN_SYS_5V0"]
+
+def iter_nvidia_smi(filename):
+    """Stream nvidia-smi --query-gpu=timestamp,[index,]power.draw --format=csv output in
+    chunks, yielding frames of time (timestamp), GPU index and power (W)"""
+    for chunk in pd.read_csv(filename, skipinitialspace=True, chunksize=chunk_lines):
+        # Columns are named e.g. "power.draw [W]" so match on prefix
+        columns = dict((c.split(" ")[0], c) for c in chunk.columns)
+
+        # Parse timestamps and power, stripping units if nounits wasn't specified and treating "[N/A]" as missing
+        time = pd.to_datetime(chunk[columns["timestamp"]], format="%Y/%m/%d %H:%M:%S.%f")
+        power = pd.to_numeric(chunk[columns["power.draw"]].astype(str).str.replace(" W", "", regex=False),
+                              errors="coerce")
+        index = chunk[columns["index"]].values if "index" in columns else np.zeros(len(chunk), dtype=int)
+
+        yield pd.DataFrame({"time": time.values, "gpu": index, "power": power.values}).dropna()
+
+def iter_tegrastats(filename, interval_ms=1000.0):
+    """Stream tegrastats output in chunks, yielding frames of time (timestamp if lines
+    are timestamped, otherwise time since start of log) and power (W) of each rail"""
+    with open(filename, "r") as log_file:
+        line_offset = 0
+        timestamped = None
+        while True:
+            lines = list(islice(log_file, chunk_lines))
+            if len(lines) == 0:
+                break
+            lines = pd.Series(lines)
+
+            # Use timestamps if newer L4T wrote them, otherwise use sample interval
+            # **NOTE** this is decided from the first line so times are consistent throughout file
+            timestamp = lines.str.extract(tegrastats_timestamp_regex, expand=False)
+            if timestamped is None:
+                timestamped = timestamp.notnull().iloc[0]
+            if timestamped:
+                time = pd.to_datetime(timestamp, format="%m-%d-%Y %H:%M:%S").values
+            else:
+                time = pd.to_timedelta((line_offset + np.arange(len(lines))) * interval_ms, unit="ms").values
+
+            # Extract instantaneous power of every rail on every line and pivot into a column per rail
+            rails = lines.str.extractall(tegrastats_rail_regex)
+            rails.columns = ["rail", "power"]
+            rails["power"] = rails["power"].astype(float) / 1000.0
+            rails = rails.reset_index(level="match", drop=True).set_index("rail", append=True)["power"].unstack("rail")
+            frame = pd.DataFrame({"time": time}, index=lines.index).join(rails)
+
+            # Drop lines without a timestamp (in timestamped files) or without any rails
+            frame = frame[frame["time"].notnull().values & frame.drop(columns="time").notnull().any(axis=1).values]
+
+            line_offset += len(lines)
+            yield frame
+
+def relative_seconds(time):
+    # Subtract first sample from (integer nanosecond) times before converting to seconds - at
+    # epoch magnitude a double only resolves ~1e-7s so converting first makes the clock jitter
+    origin = time.min()
+    seconds = (time - origin).dt.total_seconds().values
+
+    # Return origin in seconds since epoch (or since start of log) so absolute times can be recovered
+    origin_s = (origin - pd.Timestamp(0)).total_seconds() if isinstance(origin, pd.Timestamp) else origin.total_seconds()
+    return origin_s, seconds
+
+def resample(time, values, period, start_time=None, end_time=None):
+    # Build common clock, including end_time if it falls on a tick, and linearly interpolate every column of values onto it
+    # **NOTE** ticks are calculated from their index rather than by accumulating period so they don't drift
+    start_time = time[0] if start_time is None else start_time
+    end_time = time[-1] if end_time is None else end_time
+    num_ticks = int(np.floor(((end_time - start_time) / period) + 1.0E-9)) + 1
+    clock = start_time + (np.arange(num_ticks) * period)
+    return clock, np.column_stack([np.interp(clock, time, v) for v in np.atleast_2d(values.T)])
+
+def load_nvidia_smi(filename, period):
+    log = pd.concat(list(iter_nvidia_smi(filename)), ignore_index=True)
+
+    # Make times relative to first sample so clock isn't built at epoch precision
+    origin, log["time"] = relative_seconds(log["time"])
+
+    # Resample each GPU onto common clock spanning the period all GPUs were logged
+    gpus = [g for _, g in log.groupby("gpu")]
+    start_time = max(g["time"].values[0] for g in gpus)
+    end_time = min(g["time"].values[-1] for g in gpus)
+    rails = []
+    for g in gpus:
+        clock, power = resample(g["time"].values, g["power"].values, period, start_time, end_time)
+        rails.append(power[:, 0])
+
+    # Total power is sum across GPUs
+    rail_names = ["GPU %s" % g["gpu"].values[0] for g in gpus]
+    return origin, clock, np.sum(rails, axis=0), rail_names, np.column_stack(rails)
+
+def load_tegrastats(filename, period, interval_ms):
+    log = pd.concat(list(iter_tegrastats(filename, interval_ms)), ignore_index=True)
+    if len(log) == 0:
+        raise ValueError("No recognised power rails in %s" % filename)
+
+    origin, log["time"] = relative_seconds(log["time"])
+
+    rail_names = [c for c in log.columns if c != "time"]
+    clock, rails = resample(log["time"].values, log[rail_names].fillna(0.0).values, period)
+
+    # Total power is measured by input rail if present, otherwise sum all rails
+    total_rails = [r for r in tegrastats_total_rails if r in rail_names]
+    total = rails[:, rail_names.index(total_rails[0])] if total_rails else np.sum(rails, axis=1)
+    return origin, clock, total, rail_names, rails
+
+def write_power_csv(filename, time, power, rail_names, rails):
+    # Write in same layout as microcircuit_power/*.csv with additional column per rail
+    columns = np.column_stack([time, power, rails])
+    header = ",".join(["Time [s]", "Power [W]"] + ["%s [W]" % r for r in rail_names])
+    np.savetxt(filename, columns, delimiter=",", header=header, comments="",
+               fmt=["%.6f"] + (["%.9g"] * (columns.shape[1] - 1)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert software power logs to power trace CSV")
+    parser.add_argument("format", choices=["nvidia-smi", "tegrastats"])
+    parser.add_argument("log")
+    parser.add_argument("output")
+    parser.add_argument("--period", type=float, default=0.05, help="Period of common clock [s]")
+    parser.add_argument("--interval", type=float, default=1000.0, help="tegrastats sample interval [ms]")
+    parser.add_argument("--absolute", action="store_true", help="Keep times as seconds since epoch")
+    args = parser.parse_args()
+
+    if args.format == "nvidia-smi":
+        origin, time, power, rail_names, rails = load_nvidia_smi(args.log, args.period)
+    else:
+        origin, time, power, rail_names, rails = load_tegrastats(args.log, args.period, args.interval)
+
+    # Times are relative to start of log like read_lcd.py unless absolute times are requested
+    if args.absolute:
+        time = time + origin
+
+    write_power_csv(args.output, time, power, rail_names, rails)
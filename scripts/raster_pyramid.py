@@ -0,0 +1,226 @@
+import json
+import numpy as np
+import os
+import sys
+
+from collections import OrderedDict
+from os import path
+
+# Resolution of finest level of pyramid
+base_bin_ms = 1.0
+
+# Size of (square) tiles in bins
+tile_size = 256
+
+def _aggregate(neuron_bin, time_bin, counts, num_time_bins):
+    # Combine neuron and time bin into single key and sum counts of spikes sharing a key
+    key = (neuron_bin * num_time_bins) + time_bin
+    unique_key, inverse = np.unique(key, return_inverse=True)
+    unique_counts = np.bincount(inverse, weights=counts).astype(np.uint32)
+
+    return unique_key // num_time_bins, unique_key % num_time_bins, unique_counts
+
+def _write_level(level_dir, neuron_bin, time_bin, counts, num_neuron_tiles, num_time_tiles):
+    if not path.exists(level_dir):
+        os.makedirs(level_dir)
+
+    # Sort bins by tile they belong in
+    tile_key = ((neuron_bin // tile_size) * num_time_tiles) + (time_bin // tile_size)
+    order = np.argsort(tile_key, kind="mergesort")
+
+    # Calculate position of each bin within its tile
+    # **NOTE** tile_size is 256 so this fits in 16-bits
+    position = ((neuron_bin[order] % tile_size) * tile_size) + (time_bin[order] % tile_size)
+
+    # Calculate offset of each tile's bins - empty tiles simply have zero length
+    offsets = np.searchsorted(tile_key[order], np.arange(num_neuron_tiles * num_time_tiles + 1))
+
+    # Save sparse tiles so they can be memory-mapped by RasterPyramid
+    np.save(path.join(level_dir, "offsets.npy"), offsets.astype(np.int64))
+    np.save(path.join(level_dir, "positions.npy"), position.astype(np.uint16))
+    np.save(path.join(level_dir, "counts.npy"), counts[order])
+
+def _num_levels(num_bins):
+    # Number of times bins must be halved until they fit in a single tile
+    return int(max(0, np.ceil(np.log2(float(num_bins) / tile_size)))) + 1
+
+def build_pyramid(pop_spikes, out_dir, duration_ms):
+    # Stack populations on top of each other as in raster plots
+    names = [name for name, _, _, _ in pop_spikes]
+    neuron_id_offset = np.cumsum([0] + [num for _, num, _, _ in pop_spikes])
+    num_neurons = int(neuron_id_offset[-1])
+
+    # Concatenate spikes from all populations into global neuron IDs
+    spike_times = np.concatenate([times for _, _, times, _ in pop_spikes])
+    spike_ids = np.concatenate([ids + neuron_id_offset[i] for i, (_, _, _, ids) in enumerate(pop_spikes)])
+
+    # Bin spikes at finest resolution
+    num_base_time_bins = int(np.ceil(duration_ms / base_bin_ms))
+    time_bin = np.minimum((spike_times / base_bin_ms).astype(np.int64), num_base_time_bins - 1)
+    neuron_bin, time_bin, counts = _aggregate(spike_ids.astype(np.int64), time_bin,
+                                              np.ones(len(time_bin)), num_base_time_bins)
+
+    # Raster is much taller (in neurons) than it is long (in bins) so time and neuron
+    # resolution are halved independently, giving a grid of levels indexed by both
+    num_time_levels = _num_levels(num_base_time_bins)
+    num_neuron_levels = _num_levels(num_neurons)
+    levels = [[None] * num_neuron_levels for _ in range(num_time_levels)]
+    num_level_neurons = num_neurons
+    for n in range(num_neuron_levels):
+        # Start each neuron level from finest time resolution
+        level_neuron_bin = neuron_bin
+        level_time_bin = time_bin
+        level_counts = counts
+        num_time_bins = num_base_time_bins
+        for t in range(num_time_levels):
+            num_time_tiles = int(np.ceil(float(num_time_bins) / tile_size))
+            num_neuron_tiles = int(np.ceil(float(num_level_neurons) / tile_size))
+            print("Level (%u, %u): %u x %u bins, %u non-empty"
+                  % (t, n, num_level_neurons, num_time_bins, len(level_counts)))
+
+            _write_level(path.join(out_dir, "level_%u_%u" % (t, n)), level_neuron_bin, level_time_bin, level_counts,
+                         num_neuron_tiles, num_time_tiles)
+            levels[t][n] = {"num_neuron_bins": num_level_neurons, "num_time_bins": num_time_bins,
+                            "num_neuron_tiles": num_neuron_tiles, "num_time_tiles": num_time_tiles}
+
+            # Aggregate pairs of time bins
+            num_time_bins = (num_time_bins + 1) // 2
+            level_neuron_bin, level_time_bin, level_counts = _aggregate(level_neuron_bin, level_time_bin // 2,
+                                                                        level_counts, num_time_bins)
+
+        # Aggregate pairs of neurons at finest time resolution
+        num_level_neurons = (num_level_neurons + 1) // 2
+        neuron_bin, time_bin, counts = _aggregate(neuron_bin // 2, time_bin, counts, num_base_time_bins)
+
+    # Write metadata
+    with open(path.join(out_dir, "pyramid.json"), "w") as metadata_file:
+        json.dump({"base_bin_ms": base_bin_ms, "tile_size": tile_size, "duration_ms": duration_ms,
+                   "num_neurons": num_neurons, "populations": names,
+                   "neuron_id_offset": [int(o) for o in neuron_id_offset], "levels": levels},
+                  metadata_file, indent=4)
+
+class RasterPyramid(object):
+    """Reads tiles from a raster pyramid on demand, caching recently used tiles"""
+    def __init__(self, pyramid_dir, max_cached_tiles=256):
+        self.pyramid_dir = pyramid_dir
+        self.max_cached_tiles = max_cached_tiles
+        self._tile_cache = OrderedDict()
+        self._levels = {}
+
+        with open(path.join(pyramid_dir, "pyramid.json"), "r") as metadata_file:
+            self.metadata = json.load(metadata_file)
+
+    def select_level(self, time_range_ms, neuron_range, width_px, height_px):
+        """Pick the coarsest time and neuron levels which still have at least one bin per pixel"""
+        time_bins_per_px = (time_range_ms[1] - time_range_ms[0]) / (self.metadata["base_bin_ms"] * width_px)
+        neurons_per_px = (neuron_range[1] - neuron_range[0]) / float(height_px)
+
+        levels = self.metadata["levels"]
+        time_level = int(np.floor(np.log2(time_bins_per_px))) if time_bins_per_px > 1.0 else 0
+        neuron_level = int(np.floor(np.log2(neurons_per_px))) if neurons_per_px > 1.0 else 0
+        return min(time_level, len(levels) - 1), min(neuron_level, len(levels[0]) - 1)
+
+    def _get_level(self, level):
+        # Memory-map level's arrays the first time it is accessed
+        if level not in self._levels:
+            level_dir = path.join(self.pyramid_dir, "level_%u_%u" % level)
+            self._levels[level] = tuple(np.load(path.join(level_dir, f + ".npy"), mmap_mode="r")
+                                        for f in ("offsets", "positions", "counts"))
+        return self._levels[level]
+
+    def _get_level_metadata(self, level):
+        return self.metadata["levels"][level[0]][level[1]]
+
+    def get_tile(self, level, neuron_tile, time_tile):
+        key = (level, neuron_tile, time_tile)
+
+        # If tile is cached, move it to end of cache and return
+        if key in self._tile_cache:
+            tile = self._tile_cache.pop(key)
+            self._tile_cache[key] = tile
+            return tile
+
+        # Otherwise, read tile's spike counts from memory-mapped level and scatter into dense tile
+        offsets, positions, counts = self._get_level(level)
+        tile_size = self.metadata["tile_size"]
+        tile_index = (neuron_tile * self._get_level_metadata(level)["num_time_tiles"]) + time_tile
+        start = offsets[tile_index]
+        end = offsets[tile_index + 1]
+        if start == end:
+            tile = None
+        else:
+            tile = np.zeros(tile_size * tile_size, dtype=np.uint32)
+            tile[positions[start:end]] = counts[start:end]
+            tile = tile.reshape((tile_size, tile_size))
+
+        # Add to cache, evicting least recently used tile if required
+        self._tile_cache[key] = tile
+        if len(self._tile_cache) > self.max_cached_tiles:
+            self._tile_cache.popitem(last=False)
+        return tile
+
+    def load_window(self, time_range_ms, neuron_range, level):
+        """Assemble the tiles covering a window at a (time, neuron) level into a
+        single neuron x time array of spike counts and return it alongside its extent"""
+        tile_size = self.metadata["tile_size"]
+        level_meta = self._get_level_metadata(level)
+        bin_ms = self.metadata["base_bin_ms"] * (2 ** level[0])
+        neurons_per_bin = 2 ** level[1]
+
+        # Convert range to (clamped) bins
+        first_time_bin = max(0, int(np.floor(time_range_ms[0] / bin_ms)))
+        last_time_bin = min(level_meta["num_time_bins"] - 1, int(np.floor(time_range_ms[1] / bin_ms)))
+        first_neuron_bin = max(0, int(np.floor(neuron_range[0] / neurons_per_bin)))
+        last_neuron_bin = min(level_meta["num_neuron_bins"] - 1, int(np.floor(neuron_range[1] / neurons_per_bin)))
+
+        # Copy visible parts of tiles into image
+        image = np.zeros((max(0, last_neuron_bin - first_neuron_bin + 1), max(0, last_time_bin - first_time_bin + 1)),
+                         dtype=np.uint32)
+        for n in range(first_neuron_bin // tile_size, (last_neuron_bin // tile_size) + 1):
+            for t in range(first_time_bin // tile_size, (last_time_bin // tile_size) + 1):
+                tile = self.get_tile(level, n, t)
+                if tile is None:
+                    continue
+
+                # Find intersection of tile and window in bins
+                n_start = max(first_neuron_bin, n * tile_size)
+                n_end = min(last_neuron_bin + 1, (n + 1) * tile_size)
+                t_start = max(first_time_bin, t * tile_size)
+                t_end = min(last_time_bin + 1, (t + 1) * tile_size)
+                image[n_start - first_neuron_bin:n_end - first_neuron_bin,
+                      t_start - first_time_bin:t_end - first_time_bin] = tile[n_start - (n * tile_size):n_end - (n * tile_size),
+                                                                              t_start - (t * tile_size):t_end - (t * tile_size)]
+
+        # Return image alongside extent in ms and neuron IDs (suitable for imshow with origin="lower")
+        extent = (first_time_bin * bin_ms, (last_time_bin + 1) * bin_ms,
+                  first_neuron_bin * neurons_per_bin, (last_neuron_bin + 1) * neurons_per_bin)
+        return image, extent
+
+if __name__ == "__main__":
+    from microcircuit import N_full, N_scaling, population_names, read_genn_spikes
+    from nest_spikes import find_shards, load_nest_population
+
+    # Build pyramid of NEST spikes if requested, otherwise GeNN
+    nest = "nest" in sys.argv[1:]
+    nest_dir = path.join("potjans_spikes", "nest")
+    out_dir = path.join("potjans_spikes", "nest_pyramid" if nest else "pyramid")
+
+    # Load full (including transient) spike trains of each population
+    pop_spikes = []
+    for name in population_names:
+        num = int(N_full[name[:-1]][name[-1]] * N_scaling)
+
+        # Leave gaps for missing populations so neuron IDs are consistent
+        genn_path = path.join("potjans_spikes", name + ".csv")
+        if nest and all(path.exists(s) for s in find_shards(nest_dir, name)):
+            spike_times, spike_ids = load_nest_population(nest_dir, name)
+        elif not nest and path.exists(genn_path):
+            spike_times, spike_ids = read_genn_spikes(genn_path)
+        else:
+            print("Spikes for population %s missing" % name)
+            spike_times = np.empty(0)
+            spike_ids = np.empty(0, dtype=int)
+
+        pop_spikes.append((name, num, spike_times, spike_ids))
+
+    build_pyramid(pop_spikes, out_dir, 10000.0)
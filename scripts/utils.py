@@ -2,12 +2,17 @@
 import csv
 import numpy as np
 import os
+import plot_settings
 import seaborn as sns
 import sys
 import tempfile
 
 # Import classes
+from matplotlib.collections import Collection
+from matplotlib.lines import Line2D
+from matplotlib.patches import Patch
 from matplotlib.ticker import ScalarFormatter
+from matplotlib.transforms import Bbox
 
 def remove_axis_junk(axis):
     # Turn off grid
@@ -37,4 +42,73 @@ def save_raster_figure(figure, filename):
         os.system("convert %s -compress lzw %s" % (temp.name, filename + ".tif"))
 
     # Create low-res PNG for latex
-    figure.savefig(filename + ".png", dpi=200)
\ No newline at end of file
+    figure.savefig(filename + ".png", dpi=200)
+
+# Approximate bytes used to encode a vertex, a pixel and each image in each vector format
+# **NOTE** measured on plot_microcircuit_power.py - (E)PS images are uncompressed hex whereas
+# PDF and SVG images are compressed so, while plots are mostly flat colours, pixels are almost free
+rasterize_bytes_per_vertex = {"eps": 23.0, "ps": 23.0, "pdf": 5.0, "svg": 25.0}
+rasterize_bytes_per_pixel = {"eps": 6.5, "ps": 6.5, "pdf": 0.05, "svg": 0.05}
+rasterize_bytes_per_image = {"eps": 200.0, "ps": 200.0, "pdf": 700.0, "svg": 800.0}
+
+def count_vertices(artist):
+    # Count vertices of the types of artist which make up data in our figures
+    if isinstance(artist, Collection):
+        # If there are offsets (i.e. scatter plot) each one draws all paths
+        num_path_vertices = sum(len(p.vertices) for p in artist.get_paths())
+        num_offsets = len(artist.get_offsets())
+        return num_path_vertices * num_offsets if num_offsets > 1 else num_path_vertices
+    elif isinstance(artist, Line2D):
+        return len(artist.get_xydata())
+    elif isinstance(artist, Patch):
+        return len(artist.get_path().vertices)
+    else:
+        return 0
+
+def rasterize_dense_artists(figure, vertex_threshold=None, dpi=None, format="eps"):
+    if vertex_threshold is None:
+        vertex_threshold = plot_settings.rasterize_vertex_threshold
+    if dpi is None:
+        dpi = plot_settings.rasterize_dpi
+
+    # Approximate cost of vector vertices and raster pixels in each output format
+    # **NOTE** matplotlib embeds images in (E)PS as uncompressed hex so, at print resolutions, rasterizing
+    # there never pays off - vector figures are therefore saved as PDF where images are compressed
+    bytes_per_vertex = rasterize_bytes_per_vertex.get(format, 20.0)
+    bytes_per_pixel = rasterize_bytes_per_pixel.get(format, 1.0)
+    bytes_per_image = rasterize_bytes_per_image.get(format, 1000.0)
+
+    # Artist extents are in display pixels so scale to output resolution
+    pixel_scale = (float(dpi) / figure.dpi) ** 2
+
+    rasterized = []
+    for axis in figure.axes:
+        # Group artists, treating bars in containers as one
+        groups = [[a] for a in axis.collections + axis.lines + axis.patches]
+        groups.extend([a for a in container if isinstance(a, Patch)] for container in axis.containers)
+
+        # Rasterize groups which are dense and would be smaller as rasters
+        for group in groups:
+            num_vertices = sum(count_vertices(a) for a in group)
+            if num_vertices <= vertex_threshold:
+                continue
+
+            # Rasterized image covers the group's extent, clipped to the axis
+            extent = Bbox.intersection(Bbox.union([a.get_window_extent() for a in group]), axis.bbox)
+            num_pixels = 0.0 if extent is None else (extent.width * extent.height * pixel_scale)
+            if (bytes_per_image + (num_pixels * bytes_per_pixel)) < (num_vertices * bytes_per_vertex):
+                for a in group:
+                    a.set_rasterized(True)
+                    rasterized.append(a)
+    return rasterized
+
+def save_vector_figure(figure, filename, vertex_threshold=None, dpi=None):
+    if dpi is None:
+        dpi = plot_settings.rasterize_dpi
+
+    # Rasterize dense artists, leaving text and axes as vectors
+    format = os.path.splitext(filename)[1][1:].lower()
+    rasterize_dense_artists(figure, vertex_threshold, dpi, format)
+
+    # Save figure - dpi only affects rasterized artists
+    figure.savefig(filename, dpi=dpi)
\ No newline at end of file
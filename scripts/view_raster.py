@@ -0,0 +1,71 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import sys
+import plot_settings
+import utils
+
+from raster_pyramid import RasterPyramid
+
+# Open pyramid built by raster_pyramid.py
+pyramid = RasterPyramid("potjans_spikes/nest_pyramid" if "nest" in sys.argv[1:] else "potjans_spikes/pyramid")
+metadata = pyramid.metadata
+
+fig, axis = plt.subplots(figsize=(plot_settings.double_column_width, 90.0 * plot_settings.mm_to_inches))
+utils.remove_axis_junk(axis)
+
+# Label populations at their midpoints
+neuron_id_offset = np.asarray(metadata["neuron_id_offset"])
+pop_midpoints = neuron_id_offset[:-1] + ((neuron_id_offset[1:] - neuron_id_offset[:-1]) * 0.5)
+axis.set_yticks(pop_midpoints)
+axis.set_yticklabels(metadata["populations"])
+for o in neuron_id_offset[1:-1]:
+    axis.axhline(o, color="black", linewidth=0.5)
+
+axis.set_xlabel("Time [ms]")
+
+image_actor = axis.imshow(np.zeros((1, 1)), origin="lower", aspect="auto",
+                          interpolation="nearest", cmap="Greys")
+
+def update(_=None):
+    # Get visible range and size of axis in pixels
+    time_range = axis.get_xlim()
+    neuron_range = axis.get_ylim()
+    bbox = axis.get_window_extent()
+
+    # Pick level and load visible tiles
+    level = pyramid.select_level(time_range, neuron_range, bbox.width, bbox.height)
+    image, extent = pyramid.load_window(time_range, neuron_range, level)
+
+    # If view lies entirely outside of raster, hide image
+    if image.size == 0:
+        image_actor.set_visible(False)
+        fig.canvas.draw_idle()
+        return
+
+    # Update image, normalising colour scale to visible counts
+    image_actor.set_visible(True)
+    image_actor.set_data(image)
+    image_actor.set_extent(extent)
+    image_actor.set_clim(0, max(1, np.amax(image)))
+    axis.set_title("Level (%u, %u) (%gms x %u neuron bins)"
+                   % (level[0], level[1], metadata["base_bin_ms"] * (2 ** level[0]), 2 ** level[1]), loc="right")
+    fig.canvas.draw_idle()
+
+# Panning or zooming changes both x and y limits, often many times in succession, so
+# rather than re-rendering on every change, (re)start a single-shot timer and render once it fires
+update_timer = fig.canvas.new_timer(interval=100)
+update_timer.single_shot = True
+update_timer.add_callback(update)
+
+def schedule_update(_=None):
+    update_timer.stop()
+    update_timer.start()
+
+# Show entire run and re-render whenever view is panned or zoomed
+axis.set_xlim((0.0, metadata["duration_ms"]))
+axis.set_ylim((0, metadata["num_neurons"]))
+update()
+axis.callbacks.connect("xlim_changed", schedule_update)
+axis.callbacks.connect("ylim_changed", schedule_update)
+
+plt.show()